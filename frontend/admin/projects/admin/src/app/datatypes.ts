@@ -10,6 +10,7 @@ export interface Field {
     missing_values_percent: number;
     max_value: any;
     min_value: any;
+    distinct_count: number;
 }
 
 export interface Resource {
@@ -26,7 +27,12 @@ export interface Resource {
     kind: string;
     content: string;
     quality_issues: {issue: string, description: string}[];
-    chunks: Array<Record<any, any>>;
+    chunk_ids: Array<string>;
+    etag: string;
+    last_modified: string;
+    content_size: number;
+    content_hash: string;
+    content_key: string;
 }
 
 export interface Dataset {
@@ -47,6 +53,7 @@ export interface Dataset {
     quality_issues: {issue: string, description: string}[];
     status_indexing: boolean;
     versions: Record<any, any>;
+    fingerprint: string;
 }
 
 export interface DataCatalog {
@@ -49,7 +49,7 @@ export class ResourceComponent {
     return null;
   });
 
-  fieldColumns = ['name', 'data_type', 'sample_values', 'missing_values_percent', 'max_value', 'min_value'];
+  fieldColumns = ['name', 'data_type', 'sample_values', 'missing_values_percent', 'max_value', 'min_value', 'distinct_count'];
 
   constructor(private route: ActivatedRoute, public state: StateService) {
     this.state.updateFromRoute(this.route.snapshot)
@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from .resolve_firebase_user import FireBaseUser
 from ..common.deployment_repo import deployment_repo
 from ..common.catalog_repo import catalog_repo
-from ..common.metadata_store import metadata_store
+from ..common.metadata_store import metadata_store, Projection
 from ..common.qa_repo import qa_repo
 from ..common.config import config
 
@@ -66,13 +66,13 @@ async def get_catalog_datasets(deployment_id: str, catalog_id: str, user: FireBa
     catalog = catalog_repo.get_catalog(catalog_id)
     if not catalog:
         raise HTTPException(status_code=404, detail="Catalog not found")
-    result = await metadata_store.getDatasets(catalog_id, page=page, sort=sort, query=query)
+    result = await metadata_store.getDatasets(catalog_id, page=page, sort=sort, query=query, projection=Projection.LIST)
     simple_datasets = []
     for dataset in result.datasets:
         d = dataclasses.asdict(dataset)
         for r in d['resources']:
             r.pop('content', None)
-            r.pop('chunks', None)
+            r.pop('chunk_ids', None)
             r.pop('fields', None)
         d.pop('embedding', None)
         # d.pop('resources', None)
@@ -99,7 +99,7 @@ async def get_catalog_dataset(deployment_id: str, catalog_id: str, dataset_id: s
     if not catalog:
         raise HTTPException(status_code=404, detail="Catalog not found")
     store_id = f'{catalog_id}__{dataset_id}'
-    dataset = await metadata_store.getDataset(store_id)
+    dataset = await metadata_store.getDataset(store_id, Projection.NO_VECTORS)
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
     d = dataclasses.asdict(dataset)
@@ -107,7 +107,7 @@ async def get_catalog_dataset(deployment_id: str, catalog_id: str, dataset_id: s
         if r['content']:
             r['content-length'] = len(r['content'])
             r['content'] = r['content'][:300]
-        r.pop('chunks', None)
+        r.pop('chunk_ids', None)
         r.pop('fields', None)
     d.pop('embedding', None)
     return dataset
@@ -1,7 +1,7 @@
 from typing import Any
 from odds.common.vectordb import indexer
 from odds.common.store import store
-from odds.common.metadata_store import metadata_store
+from odds.common.metadata_store import metadata_store, Projection
 from odds.common.embedder import embedder
 from odds.common.catalog_repo import catalog_repo
 import sqlite3
@@ -27,7 +27,7 @@ def parse_resource_id(id):
 async def search_datasets(query: str, catalog_ids: list[str] | None) -> list[dict[str, Any]]:
     logging.debug(f'SEARCH DATASETS: {query}')
     embedding = await embedder.embed(query)
-    datasets = await indexer.findDatasets(embedding, query, catalog_ids=catalog_ids)
+    datasets = await indexer.findDatasets(embedding, query, catalog_ids=catalog_ids, projection=Projection.SUMMARY)
     catalogs = [catalog_repo.get_catalog(dataset.catalogId) for dataset in datasets]
     logging.debug(f'CATALOGS: {[catalog.title for catalog in catalogs]}')
     response = [
@@ -48,7 +48,7 @@ async def search_datasets(query: str, catalog_ids: list[str] | None) -> list[dic
 async def fetch_dataset(id):
     logging.debug(f'FETCH DATASET: {id}')
     id = decode_id(id)
-    dataset = await metadata_store.getDataset(id)
+    dataset = await metadata_store.getDataset(id, Projection.FETCH)
     response = None
     if dataset:
         response = dict(
@@ -86,7 +86,7 @@ async def fetch_dataset(id):
 async def fetch_resource(id):
     logging.debug('FETCH RESOURCE:', id)
     datasetId, resourceIdx = parse_resource_id(id)
-    dataset = await metadata_store.getDataset(datasetId)
+    dataset = await metadata_store.getDataset(datasetId, Projection.RESOURCES)
     response = None
     if dataset:
         resource = dataset.resources[resourceIdx]
@@ -117,7 +117,7 @@ async def fetch_resource(id):
 async def query_db(resource_id, sql):
     logging.debug(f'QUERY DB: {resource_id} -> {sql}')
     datasetId, resourceIdx = parse_resource_id(resource_id)
-    dataset = await metadata_store.getDataset(datasetId)
+    dataset = await metadata_store.getDataset(datasetId, Projection.RESOURCES)
     if dataset:
         resource = dataset.resources[resourceIdx]
         if resource:
@@ -10,6 +10,8 @@ from sse_starlette.sse import EventSourceResponse
 from .answer import answer_question
 from .common_endpoints import search_datasets, fetch_dataset, fetch_resource, query_db
 from ..common.deployment_repo import deployment_repo
+from ..common.http_client import http_clients
+from ..common.metadata_store.es.es_client import ESClient
 from .admin import router as admin_router
 
 app = FastAPI(openapi_url=None)
@@ -24,6 +26,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("shutdown")
+async def shutdown():
+    await http_clients.aclose()
+    await ESClient.close()
+
 CORS_HEADERS = {
     'Access-Control-Allow-Origin': '*',
     'Access-Control-Allow-Headers': 'Content-Type',
@@ -5,7 +5,7 @@ from .scanner.scanner_factory import ScannerFactory
 from ..common.catalog_repo import catalog_repo
 from ..common.datatypes import DataCatalog, Dataset
 from ..common.config import config
-from ..common.metadata_store import metadata_store
+from ..common.metadata_store import metadata_store, Projection
 from ..common.filters import CatalogFilter, CatalogFilterById, \
     DatasetFilter, DatasetFilterById, DatasetFilterNew, DatasetFilterForce, DatasetFilterIncomplete
 # from ..common.db import db
@@ -16,13 +16,20 @@ class ODDSBackend:
     
     catalogs: list[DataCatalog]
 
+    # Number of scanned datasets whose existing records are looked up together
+    SCAN_BATCH_SIZE = 100
+
     def __init__(self):
         self.scanner_factory = ScannerFactory()
         self.catalogs = catalog_repo.load_catalogs()
+        self.scan_batch_size = config.scan_batch_size or self.SCAN_BATCH_SIZE
 
 
     async def scan(self, catalogFilter: CatalogFilter, datasetFilter: DatasetFilter, use_pool=None) -> None:
-        dataset_processor.set_concurrency(config.dataset_processor_concurrency_limit or 3)
+        dataset_processor.set_concurrency(
+            config.dataset_processor_concurrency_limit or 3,
+            config.dataset_processor_max_in_flight or 100
+        )
         rts.clearAll()
         scanner_ctx = ''
         for catalog_idx, catalog in enumerate(self.catalogs):
@@ -32,34 +39,59 @@ class ODDSBackend:
                 scanner = self.scanner_factory.create_scanner(catalog, cat_ctx)
                 if scanner:
                     dataset_idx = 0
+                    batch = []
                     async for dataset in scanner.scan():
                         rts.set(cat_ctx, f'GOT DATASET {dataset.id}')
                         ctx = f'{cat_ctx}/{dataset.id}[{dataset_idx}]'
-                        existing = await metadata_store.getDataset(dataset.storeId())
-                        if existing:
-                            existing.merge(dataset)
-                            dataset = existing
-                        if await datasetFilter.consider(dataset):
-                            rts.set(cat_ctx, f'CONSIDER DATASET {dataset.id}')
-                            if use_pool:
-                                job_id = dataset.storeId()
-                                await use_pool.enqueue_job(
-                                    'dataset_processor_process',
-                                    dataset, catalog, datasetFilter, ctx,
-                                    await datasetFilter.force_resources(dataset),
-                                    _job_id=job_id
-                                )
-                            else:
-                                dataset_processor.queue(dataset, catalog, datasetFilter, ctx, await datasetFilter.force_resources(dataset))
-                        else:
-                            rts.set(cat_ctx, f'SKIP DATASET {dataset.id}')
+                        batch.append((dataset, ctx))
+                        if len(batch) >= self.scan_batch_size:
+                            await self.process_batch(batch, catalog, datasetFilter, cat_ctx, use_pool)
+                            batch = []
                         dataset_idx += 1
+                    await self.process_batch(batch, catalog, datasetFilter, cat_ctx, use_pool)
             else:
                 if config.debug:
                     rts.set(scanner_ctx, f'SKIP CATALOG {catalog.id}')
             rts.clear(cat_ctx)            
         rts.clear(scanner_ctx)
         await dataset_processor.wait()
+        await metadata_store.flush()
+
+    async def process_batch(self, batch: list[tuple[Dataset, str]], catalog: DataCatalog, datasetFilter: DatasetFilter, cat_ctx: str, use_pool) -> None:
+        # Existing records are looked up for the whole batch at once - first only the parts the filter needs,
+        # and then the full records, just for the datasets which are going to be processed
+        if not batch:
+            return
+        projection = datasetFilter.projection()
+        existing = await metadata_store.getDatasetsByIds([dataset.storeId() for dataset, _ in batch], projection)
+        considered = []
+        for dataset, ctx in batch:
+            current = existing.get(dataset.storeId())
+            if current:
+                current.merge(dataset)
+            if await datasetFilter.consider(current or dataset, current is not None):
+                rts.set(cat_ctx, f'CONSIDER DATASET {dataset.id}')
+                considered.append((dataset, current, ctx))
+            else:
+                rts.set(cat_ctx, f'SKIP DATASET {dataset.id}')
+        if projection != Projection.FULL:
+            full = await metadata_store.getDatasetsByIds([dataset.storeId() for dataset, current, _ in considered if current])
+            considered = [(dataset, full.get(dataset.storeId()), ctx) for dataset, _, ctx in considered]
+        for dataset, current, ctx in considered:
+            if current:
+                if projection != Projection.FULL:
+                    current.merge(dataset)
+                dataset = current
+            if use_pool:
+                job_id = dataset.storeId()
+                await use_pool.enqueue_job(
+                    'dataset_processor_process',
+                    dataset, catalog, datasetFilter, ctx,
+                    await datasetFilter.force_resources(dataset),
+                    _job_id=job_id
+                )
+            else:
+                await dataset_processor.queue(dataset, catalog, datasetFilter, ctx, await datasetFilter.force_resources(dataset))
 
     async def scan_required(self) -> None:
         await self.scan(CatalogFilter(), DatasetFilterIncomplete())
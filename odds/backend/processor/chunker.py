@@ -0,0 +1,151 @@
+import hashlib
+import re
+import sqlite3
+import threading
+
+from ...common.config import config, CACHE_DIR
+
+
+PARAGRAPHS = re.compile(r'\n\s*\n')
+SENTENCES = re.compile(r'(?<=[.!?;:؟۔。])\s+|\n')
+WORDS = re.compile(r'\S+\s*')
+WS = re.compile(r'\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    # Tokenizers use ~4 characters per token for latin text, but closer to ~2 for Hebrew, Arabic etc.
+    latin = sum(1 for ch in text if ch < 'ɐ')
+    return (latin + 3) // 4 + (len(text) - latin + 1) // 2
+
+
+class ChunkRegistry:
+
+    # Remembers which datasets each chunk (by hash) appeared in, across all datasets and scans,
+    # so that boilerplate repeated over many datasets (site headers, license text etc.) can be dropped.
+    # Counts only grow as datasets are registered: the datasets which were chunked before a chunk crossed
+    # the threshold keep it until they're embedded again (e.g. on the next embedder version).
+    # Its methods block on SQLite, so they're called from a worker thread, one at a time.
+
+    def __init__(self, path=CACHE_DIR / 'chunk-registry.sqlite') -> None:
+        self.path = path
+        self.conn: sqlite3.Connection = None
+        self.lock = threading.Lock()
+
+    def connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            self.conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            self.conn.execute('PRAGMA journal_mode = WAL')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS chunks (hash TEXT, dataset_id TEXT, PRIMARY KEY (hash, dataset_id))')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS chunks_dataset_id ON chunks (dataset_id)')
+        return self.conn
+
+    def register(self, dataset_id: str, hashes: list[str]) -> dict[str, int]:
+        # Replaces the dataset's chunks and returns the number of datasets each chunk appears in
+        with self.lock:
+            conn = self.connect()
+            with conn:
+                conn.execute('DELETE FROM chunks WHERE dataset_id = ?', (dataset_id,))
+                conn.executemany('INSERT OR IGNORE INTO chunks (hash, dataset_id) VALUES (?, ?)', [(h, dataset_id) for h in hashes])
+            counts = dict()
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                rows = conn.execute(
+                    'SELECT hash, COUNT(*) FROM chunks WHERE hash IN ({}) GROUP BY hash'.format(', '.join('?' for _ in batch)), batch
+                ).fetchall()
+                counts.update(rows)
+            return counts
+
+
+class Chunker:
+
+    # Splits content into token-budgeted chunks along paragraph and sentence boundaries,
+    # with some overlap between consecutive chunks. Configurable in odds.config.yaml:
+    # chunker:
+    #   max_tokens: 128
+    #   overlap_tokens: 32
+    #   max_repeats: 20
+    MAX_TOKENS = 128
+    OVERLAP_TOKENS = 32
+    # Chunks which appear in more datasets than this are considered boilerplate
+    MAX_REPEATS = 20
+
+    def __init__(self) -> None:
+        chunker_config = config.chunker
+        self.max_tokens = (chunker_config and chunker_config.max_tokens) or self.MAX_TOKENS
+        self.overlap_tokens = self.OVERLAP_TOKENS if not chunker_config or chunker_config.overlap_tokens is None else chunker_config.overlap_tokens
+        self.max_repeats = (chunker_config and chunker_config.max_repeats) or self.MAX_REPEATS
+        self.registry = ChunkRegistry()
+
+    def units(self, content: str) -> list[tuple[str, int]]:
+        # Sentences (or parts of sentences which are too long on their own) with their token estimates
+        units = []
+        for paragraph in PARAGRAPHS.split(content):
+            for sentence in SENTENCES.split(paragraph):
+                sentence = sentence.strip()
+                if not sentence:
+                    continue
+                tokens = estimate_tokens(sentence)
+                if tokens <= self.max_tokens:
+                    units.append((sentence, tokens))
+                    continue
+                part, part_tokens = '', 0
+                for word in WORDS.findall(sentence):
+                    word_tokens = estimate_tokens(word)
+                    if part and part_tokens + word_tokens > self.max_tokens:
+                        units.append((part.strip(), part_tokens))
+                        part, part_tokens = '', 0
+                    part += word
+                    part_tokens += word_tokens
+                if part.strip():
+                    units.append((part.strip(), part_tokens))
+        return units
+
+    def chunks(self, content: str) -> list[str]:
+        chunks = []
+        current: list[tuple[str, int]] = []
+        current_tokens = 0
+        for unit in self.units(content):
+            if current and current_tokens + unit[1] > self.max_tokens:
+                chunks.append(' '.join(text for text, _ in current))
+                # Carry over the trailing sentences of the previous chunk as overlap
+                overlap, overlap_tokens = [], 0
+                for prev in reversed(current):
+                    if overlap_tokens + prev[1] > self.overlap_tokens or overlap_tokens + prev[1] + unit[1] > self.max_tokens:
+                        break
+                    overlap.insert(0, prev)
+                    overlap_tokens += prev[1]
+                current, current_tokens = overlap, overlap_tokens
+            current.append(unit)
+            current_tokens += unit[1]
+        if current:
+            chunks.append(' '.join(text for text, _ in current))
+        return chunks
+
+    @staticmethod
+    def chunk_hash(chunk: str) -> str:
+        return hashlib.sha1(WS.sub(' ', chunk).strip().lower().encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def chunk_id(dataset_id: str, resource_url: str, chunk_hash: str) -> str:
+        # Ids in the chunk index are stable, so unchanged chunks are never re-embedded or re-written
+        return hashlib.sha1(f'{dataset_id}\n{resource_url}\n{chunk_hash}'.encode('utf-8')).hexdigest()
+
+    def chunk_dataset(self, dataset_id: str, contents: list[str]) -> list[list[str]]:
+        # Chunks for each of the dataset's contents, without chunks already used earlier
+        # in the same dataset and without chunks repeated across many datasets.
+        # Blocking (CPU and the registry's SQLite), async callers run it in a worker thread
+        seen = set()
+        per_content = []
+        for content in contents:
+            unique = []
+            for chunk in self.chunks(content) if content else []:
+                chunk_hash = self.chunk_hash(chunk)
+                if chunk_hash not in seen:
+                    seen.add(chunk_hash)
+                    unique.append((chunk_hash, chunk))
+            per_content.append(unique)
+        counts = self.registry.register(dataset_id, list(seen))
+        return [
+            [chunk for chunk_hash, chunk in unique if counts.get(chunk_hash, 0) <= self.max_repeats]
+            for unique in per_content
+        ]
@@ -1,29 +1,59 @@
-
 import asyncio
+
 from ...common.datatypes import Dataset, Embedding
 from ...common.embedder import embedder
 from ...common.store import store
+from ...common.vectordb import indexer
 from ...common.config import config
 from ...common.realtime_status import realtime_status as rts
+from .stages import stages
+from .chunker import Chunker
 
 
 class DatasetEmbedder:
 
-    CHUNK_SIZE = 256
-    OVERLAP_SIZE = 64
+    def __init__(self) -> None:
+        self.chunker = Chunker()
 
-    def chunks(self, content: str) -> list[str]:
-        return [content[i:i + self.CHUNK_SIZE] for i in range(0, len(content), self.CHUNK_SIZE - self.OVERLAP_SIZE)]
+    async def embed_texts(self, texts: list[str]) -> list[Embedding]:
+        async with stages.embed:
+            return await embedder.embed_many(texts)
 
     async def embed(self, dataset: Dataset, ctx: str) -> None:
         rts.set(ctx, f'EMBEDDING {dataset.better_title}')
-        embedding: Embedding = await embedder.embed(dataset.better_title) if dataset.better_title else None
+        # The title and all new resource chunks are embedded together, in as few requests as possible
+        texts = [dataset.better_title] if dataset.better_title else []
+        dataset_id = dataset.storeId()
+        resources = [resource for resource in dataset.resources if resource.content]
         for resource in dataset.resources:
-            if resource.content:
-                chunks = self.chunks(resource.content)
-                embeddings = await asyncio.gather(*[embedder.embed(chunk) for chunk in chunks])
-                embeddings = [dict(embeddings=embedding.tolist()) for embedding in embeddings if embedding is not None]
-                resource.chunks = embeddings
+            if not resource.content:
+                resource.chunk_ids = []
+        all_chunks = await asyncio.to_thread(self.chunker.chunk_dataset, dataset_id, [resource.content for resource in resources])
+        indexed = await indexer.getChunkIds(dataset)
+        new_chunks = []
+        for resource, chunks in zip(resources, all_chunks):
+            resource.chunk_ids = []
+            for chunk in chunks:
+                chunk_hash = self.chunker.chunk_hash(chunk)
+                chunk_id = self.chunker.chunk_id(dataset_id, resource.url, chunk_hash)
+                resource.chunk_ids.append(chunk_id)
+                if chunk_id not in indexed:
+                    new_chunks.append(dict(id=chunk_id, resource_url=resource.url, chunk_hash=chunk_hash))
+                    texts.append(chunk)
+        embeddings = await self.embed_texts(texts)
+        embedding: Embedding = embeddings[0] if dataset.better_title else None
+        failed = set()
+        for chunk, e in zip(new_chunks, embeddings[len(texts) - len(new_chunks):]):
+            chunk['embeddings'] = e
+            if e is None:
+                failed.add(chunk['id'])
+        for resource in resources:
+            resource.chunk_ids = [chunk_id for chunk_id in resource.chunk_ids if chunk_id not in failed]
+        await indexer.indexChunks(
+            dataset,
+            [chunk_id for resource in resources for chunk_id in resource.chunk_ids],
+            [chunk for chunk in new_chunks if chunk['embeddings'] is not None]
+        )
         dataset.status_embedding = embedding is not None
         if dataset.status_embedding:
             await store.storeEmbedding(dataset, embedding, ctx)
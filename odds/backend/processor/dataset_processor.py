@@ -6,6 +6,7 @@ from .meta_describer import MetaDescriber
 from .dataset_embedder import DatasetEmbedder
 from .dataset_indexer import DatasetIndexer
 from .quality_evaluator import evaluate_quality
+from .stages import stages
 from ...common.datatypes import Dataset, DataCatalog
 from ...common.metadata_store import metadata_store
 from ...common.db import db
@@ -16,25 +17,58 @@ from ...common.realtime_status import realtime_status as rts
 
 class DatasetProcessor:
 
-    tasks: list[asyncio.Task] = []
+    in_flight: asyncio.Semaphore = None
+    max_in_flight = 100
+    reporter: asyncio.Task = None
+    REPORT_INTERVAL = 10
+    REPORT_CTX = 'STAGES'
 
     def __init__(self) -> None:
         self.resource_processor = ResourceProcessor()
         self.meta_describer = MetaDescriber()
         self.embedder = DatasetEmbedder()
         self.indexer = DatasetIndexer()
+        self.tasks: set[asyncio.Task] = set()
 
-    def set_concurrency(self, limit: int):
+    def set_concurrency(self, limit: int, max_in_flight: int = None):
         self.resource_processor.set_concurrency_limit(limit)
+        if max_in_flight and max_in_flight != self.max_in_flight and not self.tasks:
+            self.max_in_flight = max_in_flight
+            self.in_flight = None
 
-    def queue(self, dataset: Dataset, catalog: DataCatalog, datasetFilter: DatasetFilter, ctx: str, force_resources=False):
+    async def queue(self, dataset: Dataset, catalog: DataCatalog, datasetFilter: DatasetFilter, ctx: str, force_resources=False):
+        # Blocks while `max_in_flight` datasets are being processed, which in turn
+        # stops the caller from pulling more datasets out of the scanner
+        if not self.in_flight:
+            self.in_flight = asyncio.Semaphore(self.max_in_flight)
+        await self.in_flight.acquire()
         rts.set(ctx, f'QUEUE DATASET {dataset.title}')
-        self.tasks.append(asyncio.create_task(self.process(dataset, catalog, datasetFilter, ctx, force_resources)))
+        task = asyncio.create_task(self.process(dataset, catalog, datasetFilter, ctx, force_resources))
+        self.tasks.add(task)
+        task.add_done_callback(self.task_done)
+
+    def task_done(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        self.in_flight.release()
 
     async def wait(self):
-        await asyncio.gather(*self.tasks)
+        while self.tasks:
+            await asyncio.gather(*list(self.tasks))
+
+    def ensure_reporter(self):
+        if self.reporter is None or self.reporter.done():
+            self.reporter = asyncio.create_task(self.report())
+
+    async def report(self):
+        # Periodically publish the per-stage pool usage and queue depth
+        await asyncio.sleep(self.REPORT_INTERVAL)
+        while self.tasks or stages.busy():
+            rts.set(self.REPORT_CTX, stages.status())
+            await asyncio.sleep(self.REPORT_INTERVAL)
+        rts.clear(self.REPORT_CTX)
 
     async def process(self, dataset: Dataset, catalog: DataCatalog, datasetFilter: DatasetFilter, ctx: str, force_resources: bool):
+        self.ensure_reporter()
         if config.debug:
             rts.set(ctx, f'PROCESS DATASET {dataset.versions.get('resource_analyzer')} {dataset.title} (FORCE: {force_resources})')
         try:
@@ -65,7 +99,12 @@ class DatasetProcessor:
                 if config.debug:
                     rts.set(ctx, f'NO RESOURCES, DONE')
             evaluate_quality(dataset)
-            await metadata_store.storeDataset(dataset, ctx)
+            fingerprint = dataset.content_fingerprint()
+            if fingerprint != dataset.fingerprint:
+                dataset.fingerprint = fingerprint
+                await metadata_store.storeDataset(dataset, ctx)
+            elif config.debug:
+                rts.set(ctx, f'UNCHANGED, NOT STORING')
             # await db.storeDataset(dataset, ctx)
         except Exception as e:
             rts.set(ctx, f'ERROR {e}', 'error')
@@ -8,6 +8,7 @@ from ...common.llm.llm_query import LLMQuery
 from ...common.store import store
 from ...common.config import config
 from ...common.realtime_status import realtime_status as rts
+from .stages import stages
 
 
 MAX_STR_LEN = 50000
@@ -182,15 +183,9 @@ class EvaluateDescriptionsQuery(LLMQuery):
 
 class MetaDescriber:
 
-    sem: asyncio.Semaphore = None
-    concurrency_limit: int = 3
-
     async def describe(self, catalog: DataCatalog, dataset: Dataset, ctx: str) -> None:
         # rts.set(ctx, f'DESCRIBING {dataset.title} {dataset.catalogId}')
-        if not self.sem:
-            self.sem = asyncio.Semaphore(self.concurrency_limit)
-
-        async with self.sem:
+        async with stages.llm:
             if dataset.resources[0].kind == 'website':
                 if self.dataset.resources[0].content:
                     query = MetaDescriberQueryWebsite(dataset, catalog, ctx)
@@ -1,6 +1,11 @@
-from uuid import uuid4
+from uuid import uuid5, NAMESPACE_URL
 from ...backend.settings import ALLOWED_FORMATS, TABULAR_FORMATS, UNPROCESSABLE_GOOD_FORMATS
-from ...common.datatypes import Dataset
+from ...common.datatypes import Dataset, Resource
+
+
+def issue_id(dataset: Dataset, resource: Resource, issue: str) -> str:
+    # Stable across runs, so that re-evaluating an unchanged dataset doesn't change it
+    return str(uuid5(NAMESPACE_URL, f'{dataset.storeId()}/{resource.url}/{issue}'))
 
 
 def evaluate_quality(dataset: Dataset):
@@ -41,7 +46,7 @@ def evaluate_quality(dataset: Dataset):
         r.quality_issues = []
         if r not in possible_resources:
             issue = {
-                'id': str(uuid4()),
+                'id': issue_id(dataset, r, 'irrelevant_resource'),
                 'issue': 'irrelevant_resource',
                 'description': f'Possibly unusable resource: {r.title} ({r.file_format})'
             }
@@ -52,7 +57,7 @@ def evaluate_quality(dataset: Dataset):
     for r in relevant_resources:
         if r not in loaded_resources:
             issue = {
-                'id': str(uuid4()),
+                'id': issue_id(dataset, r, 'corrupt_resource'),
                 'issue': 'corrupt_resource',
                 'description': f'Resource failed to load: {r.title} ({r.loading_error})'
             }
@@ -63,7 +68,7 @@ def evaluate_quality(dataset: Dataset):
     for r in tabular_resources:
         if r not in good_number_of_rows:
             issue = {
-                'id': str(uuid4()),
+                'id': issue_id(dataset, r, 'low_number_of_rows'),
                 'issue': 'low_number_of_rows',
                 'description': f'Resource has very few rows: {r.title} ({r.row_count} rows)'
             }
@@ -1,27 +1,29 @@
 import asyncio
 import base64
-from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from concurrent.futures.process import BrokenProcessPool
+import functools
+import hashlib
+import json
+import multiprocessing
+import time
 from typing import Any, List
-import httpx
 import uuid
 import os
-import csv
 import bs4
 
-
-csv.field_size_limit(10000000)
-
-import dataflows as DF
-from sqlalchemy import create_engine
-from sqlalchemy.sql import text
-
+from ..tabular import tabular_loader
 from ...common.datatypes import Dataset, Resource, Field, DataCatalog
 from ...common.datatypes_website import WebsiteResource
 from ...common.store import store
 from ...common.config import config, CACHE_DIR
+from ...common.http_client import http_clients
 from ...common.realtime_status import realtime_status as rts
 from ...common.llm import llm_runner
 from ...common.llm.llm_query import LLMQuery
+from .stages import stages
+from .resumable_download import ResumableDownload
 from ..settings import ALLOWED_FORMATS, DOCUMENT_FORMATS, DOCUMENT_MIMETYPES, UNPROCESSABLE_GOOD_FORMATS
 import traceback
 
@@ -36,6 +38,9 @@ TMP_DIR = str(TMP_DIR)
 TIMEOUT_VALIDATE = 600
 TIMEOUT_DOWNLOAD = 600
 TIMEOUT_DB = 600
+TIMEOUT_GRACE = 30
+SAMPLE_SIZE = 10000
+HASH_BLOCK_SIZE = 1024 * 1024
 
 class MDConverterQuery(LLMQuery):
 
@@ -59,10 +64,11 @@ Finally, if it doesn't contain any relevant information whatsoever (for example,
 Remember, you must output ONLY a markdown-formatted text __or__ the ONLY word "IRRELEVANT"/"UNDECIPHERABLE"  as the final result. Do not include any other preamble or postamble text in your response. Reply in {language}.
 """
 
-    def __init__(self, ctx: str, catalog: DataCatalog, resource: Resource, data_b64: str = None, filename: str = None):
+    def __init__(self, ctx: str, catalog: DataCatalog, resource: Resource, data_b64: str = None, filename: str = None, data_digest: str = None):
         super().__init__(None, catalog)
         self.resource = resource
         self.data_b64 = data_b64
+        self.data_digest = data_digest
         self.filename = filename
         self.language = self.catalog.language or 'English'
         self.rand = uuid.uuid4().hex
@@ -73,6 +79,11 @@ Remember, you must output ONLY a markdown-formatted text __or__ the ONLY word "I
 
     def temperature(self) -> float:
         return 0
+
+    def payload_digests(self) -> list[tuple[str, str]]:
+        if self.data_b64 and self.data_digest:
+            return [(self.data_b64, self.data_digest)]
+        return []
     
     # def prepare_content(self, content):
     #     soup = bs4.BeautifulSoup(content, 'html.parser')
@@ -149,8 +160,8 @@ Remember, you must output ONLY a markdown-formatted text __or__ the ONLY word "I
 
 class ResourceProcessor:
 
-    sem: asyncio.Semaphore = None
-    concurrency_limit = 7
+    executor: ProcessPoolExecutor = None
+    content_locks: dict[str, list] = {}
 
     MISSING_VALUES = ['None', 'NULL', 'N/A', 'NA', 'NAN', 'NaN', 'nan', '-']
     BIG_FILE_SIZE = 1_000_000_000
@@ -171,208 +182,241 @@ class ResourceProcessor:
     def format_idx(resource: Resource):
         return ALLOWED_FORMATS.index(resource.file_format.lower())
 
-    def limiter(self):
-        def func(rows):
-            for i, row in enumerate(rows):
-                if i < 10000:
-                    yield row
-        return func
-
-    def updater(self, ctx, message):
-        def func(rows):
-            for i, row in enumerate(rows):
-                if i % 100000 == 0:
-                    rts.set(ctx, message(i))
-                yield row
-        return func
-
-
-    def validate_data(self, ctx, filename, stream):
-        dp, _ = DF.Flow(
-            DF.load(filename, 
-                    override_schema={'missingValues': self.MISSING_VALUES},
-                    deduplicate_headers=True,
-                    deduplicate_headers_case_sensitive=False,
-                    deduplicate_headers_format='__%s',
-                    # http_timeout=60
-            ),
-            DF.update_resource(-1, name='data'),
-            DF.validate(on_error=DF.schema_validator.clear),
-            self.updater(ctx, lambda i: f'LOADED {i} ROWS TO DISK'),
-            DF.stream(stream)
-        ).process()
-        rts.set(ctx, f'VALIDATED {filename} to {stream.name}')
-        return dp
-
-    def load_sample(self, ctx, stream_name):
-        data = DF.Flow(
-            DF.unstream(stream_name),
-            self.limiter(),
-        ).results(on_error=None)[0][0]
-        rts.set(ctx, f'READ DATA {len(data)} ROWS from {stream_name}')
-        return data
-    
-    def write_db(self, ctx, sqlite_filename, stream_name, data, resource, field_names):
-        sqlite_url = f'sqlite:///{sqlite_filename}'
-        engine = create_engine(sqlite_url)
-        DF.Flow(
-            DF.unstream(stream_name),
-            DF.select_fields(field_names),
-            self.updater(ctx, lambda i: f'DUMPED {i} ROWS TO SQLITE'),
-            DF.dump_to_sql({'data': {'resource-name': 'data'}}, engine=engine),
-        ).process()
-        rts.set(ctx, f'DUMPED {len(data)} ROWS from {resource.url} TO {sqlite_filename}')
-        with engine.connect() as conn:
-            # row count:
-            resource.row_count = conn.execute(text('SELECT COUNT(*) FROM data')).fetchone()[0]
-            # get the table's CREATE TABLE text:
-            resource.db_schema = conn.execute(text('SELECT sql FROM sqlite_master WHERE type="table" AND name="data"')).fetchone()[0]
-            resource.status = 'loaded'
-            resource.status_loaded = True
-        rts.set(ctx, f'SQLITE DATA {resource.url} HAS {resource.row_count} ROWS')
-        return resource
-    
-    async def download_url(self, ctx, catalog, resource, to_delete, rand, limit=None):
+    def get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None and config.tabular_executor == 'process':
+            max_workers = config.tabular_process_pool_size or stages.cpu.limit
+            self.executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return self.executor
+
+    def content_key(self, content_hash: str) -> str:
+        # Stored content meta and DBs are keyed by the file's hash along with the analyzer version and loading
+        # parameters, so that a version bump or a parameter change doesn't reuse stale profiles and DBs
+        params = [config.feature_versions.resource_analyzer, self.MISSING_VALUES, SAMPLE_SIZE, self.MAX_FIELDS]
+        version = hashlib.md5(json.dumps(params, default=str).encode()).hexdigest()[:12]
+        return f'{content_hash}-{version}'
+
+    @asynccontextmanager
+    async def content_lock(self, content_hash):
+        # Single flight per content hash within this worker, so that identical files
+        # which are being processed concurrently are only loaded once
+        entry = self.content_locks.setdefault(content_hash, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.content_locks[content_hash]
+
+    async def run_cpu(self, ctx, timeout, func, *args):
+        # Run one of the CPU-bound tabular_loader functions, either in the process pool
+        # (when `tabular_executor: process` is configured) or in a worker thread.
+        # The deadline is checked inside the function itself, so a timed out flow
+        # stops on its own and frees its thread/process slot.
+        deadline = time.time() + timeout
+        async with asyncio.timeout(timeout + TIMEOUT_GRACE):
+            executor = self.get_executor()
+            if executor is not None:
+                try:
+                    return await asyncio.get_running_loop().run_in_executor(
+                        executor, functools.partial(func, *args, deadline=deadline)
+                    )
+                except BrokenProcessPool:
+                    rts.set(ctx, f'PROCESS POOL BROKEN, RESTARTING', 'error')
+                    self.executor = None
+                    raise
+            else:
+                return await asyncio.to_thread(func, *args, deadline=deadline, progress=lambda msg: rts.set(ctx, msg))
+
+    @staticmethod
+    def file_hash(filename):
+        digest = hashlib.sha256()
+        with open(filename, 'rb') as f:
+            while block := f.read(HASH_BLOCK_SIZE):
+                digest.update(block)
+        return digest.hexdigest(), os.path.getsize(filename)
+
+    def restore_loaded(self, ctx, resource: Resource):
+        # The upstream file didn't change since it was last loaded successfully,
+        # so the stored fields, schema, content and DB are all still valid
+        resource.status = 'loaded'
+        resource.status_loaded = True
+        resource.loading_error = None
+        rts.set(ctx, f'UNCHANGED {resource.url}')
+
+    async def download_url(self, ctx, catalog, resource, to_delete, rand, limit=None, conditional=False):
+        # Returns the local filename of the resource's data, or None if `conditional` is set
+        # and the upstream file is identical to the one that was previously loaded.
+        # The resource's validators (etag, last_modified, content_size, content_hash) are updated in place.
         rts.set(ctx, f'LOADING FROM URL {resource.url}')
         usable_url = await resource.get_openable_url(ctx)
         if usable_url.startswith('http'):
             suffix = usable_url.split('?')[0].split('.')[-1]
             suffix = suffix.replace('/', '.')
             filename = f'{TMP_DIR}/{rand}.{suffix}'
-
-            with open(filename, 'wb') as f:
-                to_delete.append(filename)
-                total_size = 0
-                async with httpx.AsyncClient() as client:
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:143.0) Gecko/20100101 Firefox/143.0'
-                    }
-                    headers.update(catalog.http_headers)
-                    report = 0
-                    async with asyncio.timeout(TIMEOUT_DOWNLOAD):
-                        async with client.stream('GET', resource.url, headers=headers, timeout=60, follow_redirects=True) as response:
-                            async for chunk in response.aiter_bytes():  
-                                f.write(chunk)
-                                total_size += len(chunk)
-                                while total_size - report > 1000000:
-                                    report += 1000000
-                                    rts.set(ctx, f'DOWNLOADED {report} BYTES from {resource.url} to {filename}')
-                                assert limit is None or total_size < limit, f'File too big > {limit}'
-            return filename
+            to_delete.append(filename)
+
+            headers = {
+                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:143.0) Gecko/20100101 Firefox/143.0'
+            }
+            headers.update(catalog.http_headers)
+            conditional_headers = {}
+            if conditional:
+                if resource.etag:
+                    conditional_headers['If-None-Match'] = resource.etag
+                if resource.last_modified:
+                    conditional_headers['If-Modified-Since'] = resource.last_modified
+            download = ResumableDownload(ctx, resource.url, headers, limit)
+            async with http_clients.client('fetch') as client:
+                # A timed out download is kept in the partial cache and resumed on the next attempt
+                async with asyncio.timeout(TIMEOUT_DOWNLOAD):
+                    modified = await download.fetch(client, filename, conditional_headers)
+            if not modified:
+                rts.set(ctx, f'NOT MODIFIED {resource.url}')
+                return None
+            resource.etag = download.etag
+            resource.last_modified = download.last_modified
         else:
-            return usable_url
-
-    async def process_tabular(self, catalog: DataCatalog, dataset: Dataset, resource: Resource, to_delete: List[str], ctx: str):
+            filename = usable_url
+        content_hash, total_size = await asyncio.to_thread(self.file_hash, filename)
+
+        unchanged = conditional and content_hash == resource.content_hash
+        resource.content_hash = content_hash
+        resource.content_size = total_size
+        if unchanged:
+            rts.set(ctx, f'SAME CONTENT HASH {resource.url}')
+            return None
+        return filename
+
+    async def process_tabular(self, catalog: DataCatalog, dataset: Dataset, resource: Resource, to_delete: List[str], ctx: str, conditional=False):
         rand = uuid.uuid4().hex
-        with open(f'{TMP_DIR}/{rand}.ndjson', 'w') as stream:
-            to_delete.append(f'{TMP_DIR}/{rand}.ndjson')
-            try:
-                filename = await self.download_url(ctx, catalog, resource, to_delete, rand, limit=self.BIG_FILE_SIZE)
-                async with asyncio.timeout(TIMEOUT_VALIDATE):
-                    dp = await asyncio.to_thread(self.validate_data, ctx, filename, stream)
-                potential_fields = [
-                    Field(name=field['name'], data_type=field['type'])
-                    for field in 
-                    dp.resources[0].descriptor['schema']['fields']
-                ]
-                existing_fields = dict((f.name, f) for f in resource.fields or [])
-                data = await asyncio.to_thread(self.load_sample, ctx, stream.name)
-
-                if len(data) == 0:
-                    resource.loading_error = 'NO DATA'
-                    rts.set(ctx, f'NO DATA {resource.url}')
-                    return
-
-                resource.fields = []
-                field_names = []
-                for field in potential_fields:
-                    col_name = field.name
-                    
-                    values = [row[col_name] for row in data]
-                    true_values = [x for x in values if x is not None]
-                    if len(true_values) == 0:
-                        continue
-                    if col_name in existing_fields:
-                        field.title = existing_fields[col_name].title
-                        field.description = existing_fields[col_name].description
-
-                    resource.fields.append(field)
-                    try:
-                        field.sample_values = [str(x) for x, _ in Counter(true_values).most_common(10)]
-                        field.sample_values = [x for x in field.sample_values if len(x) < 100]
-                        if len(field.sample_values) == 1:
-                            # if all values are the same, no need for this field in the db
-                            continue
-                    except:
-                        pass
-                    field_names.append(col_name)
-                    if len(values) > 0 and len(true_values) != len(values):
-                        field.missing_values_percent = int(100 * (len(values) - len(true_values)) / len(values))
-                    if field.data_type in ('number', 'integer', 'date', 'time', 'datetime'):
-                        true_values = set(true_values)
-                        try:
-                            field.max_value = str(max(true_values))
-                            field.min_value = str(min(true_values))
-                        except:
-                            pass
-                if len(field_names) > self.MAX_FIELDS:
-                    resource.loading_error = f'TOO MANY FIELDS - {len(field_names)}'
-                    rts.set(ctx, f'SKIPPING {resource.url} TOO MANY FIELDS')
-                    return
-
-                stream.close()
-
-                sqlite_filename = f'{TMP_DIR}/{rand}.sqlite'
-                async with asyncio.timeout(TIMEOUT_DB):
-                    resource = await asyncio.to_thread(self.write_db, ctx, sqlite_filename, stream.name, data, resource, field_names)
-                    deleted = await store.storeDB(resource, dataset, sqlite_filename, ctx)
-                if not deleted:
+        try:
+            async with stages.io:
+                filename = await self.download_url(ctx, catalog, resource, to_delete, rand, limit=self.BIG_FILE_SIZE, conditional=conditional)
+            if filename is None:
+                self.restore_loaded(ctx, resource)
+                return
+            content_key = self.content_key(resource.content_hash)
+            async with self.content_lock(content_key):
+                loaded = await store.getContentMeta(content_key)
+                if loaded is not None:
+                    rts.set(ctx, f'REUSING CONTENT {content_key} FOR {resource.url}')
+                else:
+                    sqlite_filename = f'{TMP_DIR}/{rand}.sqlite'
                     to_delete.append(sqlite_filename)
+                    async with stages.cpu:
+                        loaded = await self.run_cpu(
+                            ctx, TIMEOUT_VALIDATE + TIMEOUT_DB, tabular_loader.load_tabular,
+                            filename, sqlite_filename, self.MISSING_VALUES, SAMPLE_SIZE, self.MAX_FIELDS
+                        )
+                    if loaded['row_count']:
+                        async with stages.io:
+                            deleted = await store.storeContentDB(content_key, sqlite_filename, ctx)
+                        if deleted:
+                            to_delete.remove(sqlite_filename)
+                    # Stored last, so that having the meta means that the db is there too
+                    async with stages.io:
+                        await store.storeContentMeta(content_key, loaded, ctx)
+            resource.content_key = content_key
+
+            if loaded['row_count'] == 0:
+                resource.loading_error = 'NO DATA'
+                rts.set(ctx, f'NO DATA {resource.url}')
+                return
+
+            existing_fields = dict((f.name, f) for f in resource.fields or [])
+            resource.fields = []
+            for profile in loaded['fields']:
+                field = Field(
+                    name=profile['name'],
+                    data_type=profile['data_type'],
+                    sample_values=profile.get('sample_values', []),
+                    missing_values_percent=profile.get('missing_values_percent'),
+                    max_value=profile.get('max_value'),
+                    min_value=profile.get('min_value'),
+                    distinct_count=profile.get('distinct_count'),
+                )
+                if field.name in existing_fields:
+                    field.title = existing_fields[field.name].title
+                    field.description = existing_fields[field.name].description
+                resource.fields.append(field)
+
+            if loaded['too_many_fields']:
+                resource.loading_error = f'TOO MANY FIELDS - {loaded["too_many_fields"]}'
+                rts.set(ctx, f'SKIPPING {resource.url} TOO MANY FIELDS')
+                return
 
-            except Exception as e:
-                tb = traceback.extract_tb(e.__traceback__)
-                if tb:
-                    # Find the last frame that's in the main code (not in libraries)
-                    main_frame = None
-                    for frame in reversed(tb):
-                        if not frame.filename.startswith(('/usr/lib/', '/usr/local/lib/', '<frozen importlib._bootstrap')):
-                            main_frame = frame
-                            break
-
-                    if main_frame:
-                        filename = main_frame.filename
-                        lineno = main_frame.lineno
-                        rts.set(ctx, f'FAILED TO LOAD in process_tabular {resource.url}: {e!r} at {filename}:{lineno}', 'error')
-                    else:
-                        rts.set(ctx, f'FAILED TO LOAD in process_tabular {resource.url}: {e!r}', 'error')
+            resource.row_count = loaded['row_count']
+            resource.db_schema = loaded['db_schema']
+            resource.status = 'loaded'
+            resource.status_loaded = True
+            rts.set(ctx, f'SQLITE DATA {resource.url} HAS {resource.row_count} ROWS')
+
+        except Exception as e:
+            tb = traceback.extract_tb(e.__traceback__)
+            if tb:
+                # Find the last frame that's in the main code (not in libraries)
+                main_frame = None
+                for frame in reversed(tb):
+                    if not frame.filename.startswith(('/usr/lib/', '/usr/local/lib/', '<frozen importlib._bootstrap')):
+                        main_frame = frame
+                        break
+
+                if main_frame:
+                    filename = main_frame.filename
+                    lineno = main_frame.lineno
+                    rts.set(ctx, f'FAILED TO LOAD in process_tabular {resource.url}: {e!r} at {filename}:{lineno}', 'error')
                 else:
                     rts.set(ctx, f'FAILED TO LOAD in process_tabular {resource.url}: {e!r}', 'error')
-                resource.status = 'failed'
-                resource.loading_error = str(e)
-                return
+            else:
+                rts.set(ctx, f'FAILED TO LOAD in process_tabular {resource.url}: {e!r}', 'error')
+            resource.status = 'failed'
+            resource.loading_error = str(e)
+            return
 
     async def process_website(self, catalog: DataCatalog, dataset: Dataset, resource: WebsiteResource, to_delete: List[str], ctx: str):
         resource.content = open(resource.url, 'r').read()
         query = MDConverterQuery(ctx, catalog, resource)
-        await llm_runner.run(query, [dataset.id])
+        async with stages.llm:
+            await llm_runner.run(query, [dataset.id])
 
-    async def process_document(self, catalog: DataCatalog, dataset: Dataset, resource: Resource, to_delete: List[str], ctx: str):
+    async def process_document(self, catalog: DataCatalog, dataset: Dataset, resource: Resource, to_delete: List[str], ctx: str, conditional=False):
         rand = uuid.uuid4().hex
         try:
-            filename = await self.download_url(ctx, catalog, resource, to_delete, rand, limit=self.BIG_FILE_SIZE)
-            mimetype = DOCUMENT_MIMETYPES.get(resource.file_format)
-            content = open(filename, 'rb').read()
-            content = base64.b64encode(content).decode('ascii').replace('\n', '')
-            content = f'data:{mimetype};base64,{content}'
-            print('CONVERTING', filename, content[:100])
-            query = MDConverterQuery(ctx, catalog, resource, content, filename=filename.split('/')[-1])
-            await llm_runner.run(query, [dataset.id])
+            async with stages.io:
+                filename = await self.download_url(ctx, catalog, resource, to_delete, rand, limit=self.BIG_FILE_SIZE, conditional=conditional)
+            if filename is None:
+                self.restore_loaded(ctx, resource)
+                return
+            print('CONVERTING', filename)
+            query = self.document_query(ctx, catalog, resource, filename)
+            async with stages.llm:
+                await llm_runner.run(query, [dataset.id])
         except Exception as e:
             rts.set(ctx, f'FAILED TO LOAD in process_document {resource.url}: {e}', 'error')
             resource.status = 'failed'
             resource.loading_error = str(e)
             return
 
+    @staticmethod
+    def document_query(ctx: str, catalog: DataCatalog, resource: Resource, filename: str) -> MDConverterQuery:
+        # The request must be the same for every download of the same file (even when it's linked from
+        # several datasets), so that identical conversions are coalesced and cached - hence a file name
+        # derived from the content rather than the random local one
+        mimetype = DOCUMENT_MIMETYPES.get(resource.file_format)
+        content = open(filename, 'rb').read()
+        content = base64.b64encode(content).decode('ascii').replace('\n', '')
+        content = f'data:{mimetype};base64,{content}'
+        if resource.content_hash:
+            document_name = f'{resource.content_hash}.{resource.file_format.lower()}'
+            # The file was hashed while downloading, so the (big) data URI doesn't need to be hashed again for the cache key
+            data_digest = f'data:{mimetype};sha256:{resource.content_hash}'
+        else:
+            document_name = resource.url.split('?')[0].rstrip('/').split('/')[-1]
+            data_digest = None
+        return MDConverterQuery(ctx, catalog, resource, content, filename=document_name, data_digest=data_digest)
+
     async def process(self, resource: Resource, dataset: Dataset, catalog: DataCatalog, ctx: str, force=False):
         try:
             if not ResourceProcessor.check_format(resource):
@@ -398,26 +442,34 @@ class ResourceProcessor:
                     past_limit = int(past_limit)
                     if past_limit >= self.BIG_FILE_SIZE:
                         return None
+            # A forced reprocessing of a resource that was loaded successfully before
+            # can skip all the work if the upstream file didn't change
+            # (and, for tabular data, if it was loaded by the current analyzer version)
+            conditional = bool(
+                resource.status_loaded and not resource.loading_error and resource.content_hash and (
+                    (resource.db_schema and resource.content_key == self.content_key(resource.content_hash)) or
+                    resource.content
+                )
+            )
             resource.status_selected = True
             resource.loading_error = None
             resource.status_loaded = False
             to_delete = []
-            if not self.sem:
-                self.sem = asyncio.Semaphore(self.concurrency_limit)
             try:
-                async with self.sem:
-                    rts.set(ctx, f'PROCESSING Format {resource.file_format}')
-                    if resource.file_format == 'website':
-                        await self.process_website(catalog, dataset, resource, to_delete, ctx)
-                    elif resource.file_format in DOCUMENT_FORMATS:
-                        await self.process_document(catalog, dataset, resource, to_delete, ctx)
-                    else:
-                        await self.process_tabular(catalog, dataset, resource, to_delete, ctx)
+                rts.set(ctx, f'PROCESSING Format {resource.file_format}')
+                if resource.file_format == 'website':
+                    await self.process_website(catalog, dataset, resource, to_delete, ctx)
+                elif resource.file_format in DOCUMENT_FORMATS:
+                    await self.process_document(catalog, dataset, resource, to_delete, ctx, conditional=conditional)
+                else:
+                    await self.process_tabular(catalog, dataset, resource, to_delete, ctx, conditional=conditional)
 
             finally:
                 for filename in to_delete:
                     try:
                         os.unlink(filename)
+                    except FileNotFoundError:
+                        pass
                     except Exception as e:
                         rts.set(ctx, f'FAILED TO DELETE {filename}: {e}', 'error')
         finally:
@@ -425,5 +477,8 @@ class ResourceProcessor:
 
 
     def set_concurrency_limit(self, concurrency_limit):
-        self.concurrency_limit = concurrency_limit
+        # Kept for the global `dataset_processor_concurrency_limit` setting,
+        # which sizes the network I/O stage unless it's configured explicitly
+        if 'io' not in stages.configured:
+            stages.io.set_limit(concurrency_limit)
         return self
\ No newline at end of file
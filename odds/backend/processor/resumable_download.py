@@ -0,0 +1,289 @@
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+import httpx
+
+from ...common.config import CACHE_DIR
+from ...common.realtime_status import realtime_status as rts
+
+
+PARTIAL_DIR = CACHE_DIR / 'resource-processor-partial'
+try:
+    PARTIAL_DIR.mkdir(exist_ok=True, parents=True)
+except:
+    pass
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 5
+PARALLEL_MIN_SIZE = 64 * 1024 * 1024
+PARALLEL_SEGMENTS = 4
+SAVE_EVERY = 4 * 1024 * 1024
+REPORT_EVERY = 1000000
+PARTIAL_MAX_AGE = 7 * 24 * 3600
+
+
+class RestartDownload(Exception):
+
+    def __init__(self, sequential=False) -> None:
+        super().__init__()
+        # The server replied to a range request with the full file, so it shouldn't be downloaded in segments
+        self.sequential = sequential
+
+
+class ResumableDownload:
+
+    # Downloads a URL into a partial file that's kept in a persistent cache (shared by all workers)
+    # along with a JSON sidecar describing its segments and validators.
+    # An interrupted download (timeout, connection reset, worker restart) continues from its last
+    # offset using Range + If-Range requests, either in the same call or on the next scan.
+    # Big files on servers which accept ranges are fetched in several parallel segments.
+
+    cleaned_up = False
+
+    def __init__(self, ctx: str, url: str, headers: dict, limit: int = None) -> None:
+        self.ctx = ctx
+        self.url = url
+        self.headers = headers
+        self.limit = limit
+        key = hashlib.md5(url.encode()).hexdigest()
+        self.partial_filename = PARTIAL_DIR / f'{key}.part'
+        self.state_filename = PARTIAL_DIR / f'{key}.json'
+        self.lock_filename = PARTIAL_DIR / f'{key}.lock'
+        self.persistent = True
+        self.lock_fd = None
+        self.state: dict = None
+        self.done = False
+        self.sequential = False
+        self.reported = 0
+        self.saved = 0
+
+    @property
+    def etag(self):
+        return self.state.get('etag') if self.state else None
+
+    @property
+    def last_modified(self):
+        return self.state.get('last_modified') if self.state else None
+
+    async def fetch(self, client: httpx.AsyncClient, filename: str, conditional_headers: dict = None) -> bool:
+        # Returns False if the server replied with 304 Not Modified to the conditional headers,
+        # otherwise the complete file is moved to `filename`
+        self.cleanup()
+        if not self.acquire():
+            # Someone else is downloading the same URL right now, don't share the partial file
+            self.persistent = False
+            rand = uuid.uuid4().hex
+            self.partial_filename = PARTIAL_DIR / f'{rand}.part'
+            self.state_filename = PARTIAL_DIR / f'{rand}.json'
+        try:
+            self.state = self.load_state()
+            if self.state is not None:
+                rts.set(self.ctx, f'RESUMING DOWNLOAD OF {self.url} FROM {self.downloaded()} BYTES')
+            attempt = 0
+            while True:
+                try:
+                    if self.state is None:
+                        if not await self.start(client, conditional_headers):
+                            self.discard()
+                            return False
+                    await self.resume(client)
+                    break
+                except RestartDownload as e:
+                    self.sequential = self.sequential or e.sequential
+                    rts.set(self.ctx, f'RESTARTING DOWNLOAD OF {self.url}, FILE CHANGED OR RANGES NOT SUPPORTED')
+                    self.discard()
+                    attempt += 1
+                    if attempt >= MAX_ATTEMPTS:
+                        raise
+                except httpx.TransportError as e:
+                    attempt += 1
+                    if attempt >= MAX_ATTEMPTS or not self.resumable():
+                        raise
+                    self.save_state()
+                    rts.set(self.ctx, f'RETRYING DOWNLOAD OF {self.url} FROM {self.downloaded()} BYTES ({attempt}): {e!r}')
+                    await asyncio.sleep(RETRY_DELAY * attempt)
+            shutil.move(self.partial_filename, filename)
+            self.done = True
+            self.discard()
+            return True
+        finally:
+            if not self.done:
+                if self.persistent and self.resumable():
+                    self.save_state()
+                else:
+                    self.discard()
+            self.release()
+
+    async def start(self, client: httpx.AsyncClient, conditional_headers: dict) -> bool:
+        headers = dict(self.headers)
+        headers.update(conditional_headers or {})
+        async with client.stream('GET', self.url, headers=headers, timeout=60, follow_redirects=True) as response:
+            if conditional_headers and response.status_code == 304:
+                return False
+            size = response.headers.get('content-length')
+            size = int(size) if size and size.isdigit() else None
+            assert self.limit is None or size is None or size < self.limit, f'File too big > {self.limit}'
+            self.state = dict(
+                url=self.url,
+                etag=response.headers.get('etag'),
+                last_modified=response.headers.get('last-modified'),
+                size=size,
+                # Offsets of compressed responses don't match the decoded bytes we write
+                resumable=response.headers.get('content-encoding') in (None, 'identity'),
+                segments=[[0, size, 0]],
+            )
+            parallel = (
+                not self.sequential and self.resumable() and size is not None and size >= PARALLEL_MIN_SIZE and
+                response.headers.get('accept-ranges') == 'bytes'
+            )
+            with open(self.partial_filename, 'wb') as f:
+                if parallel:
+                    f.truncate(size)
+                    segment_size = size // PARALLEL_SEGMENTS + 1
+                    self.state['segments'] = [
+                        [start, min(start + segment_size, size), start]
+                        for start in range(0, size, segment_size)
+                    ]
+                    rts.set(self.ctx, f'DOWNLOADING {self.url} IN {len(self.state["segments"])} SEGMENTS')
+                else:
+                    await self.write(response, f, self.state['segments'][0])
+        return True
+
+    async def resume(self, client: httpx.AsyncClient):
+        segments = [segment for segment in self.state['segments'] if not self.complete(segment)]
+        if not segments:
+            return
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for segment in segments:
+                    tg.create_task(self.fetch_segment(client, segment))
+        except ExceptionGroup as eg:
+            for e in eg.exceptions:
+                if isinstance(e, RestartDownload):
+                    raise e
+            raise eg.exceptions[0]
+
+    async def fetch_segment(self, client: httpx.AsyncClient, segment: list):
+        start, end, pos = segment
+        headers = dict(self.headers)
+        headers['Range'] = f'bytes={pos}-{end - 1 if end is not None else ""}'
+        headers['If-Range'] = self.validator()
+        async with client.stream('GET', self.url, headers=headers, timeout=60, follow_redirects=True) as response:
+            if response.status_code != 206:
+                # A 200 means the file changed (If-Range didn't match) or that the server ignores ranges,
+                # either way the file is downloaded again in one piece
+                raise RestartDownload(sequential=response.status_code == 200)
+            with open(self.partial_filename, 'r+b') as f:
+                await self.write(response, f, segment)
+
+    async def write(self, response: httpx.Response, f, segment: list):
+        start, end, pos = segment
+        f.seek(pos)
+        async for chunk in response.aiter_bytes():
+            if end is not None and segment[2] + len(chunk) > end:
+                chunk = chunk[:end - segment[2]]
+            f.write(chunk)
+            segment[2] += len(chunk)
+            assert self.limit is None or segment[2] < self.limit, f'File too big > {self.limit}'
+            self.progress(f)
+            if end is not None and segment[2] >= end:
+                break
+        if end is None:
+            # Unknown size, the stream ended so this is the complete file
+            segment[1] = segment[2]
+
+    def progress(self, f):
+        downloaded = self.downloaded()
+        while downloaded - self.reported > REPORT_EVERY:
+            self.reported += REPORT_EVERY
+            rts.set(self.ctx, f'DOWNLOADED {self.reported} BYTES from {self.url}')
+        if self.persistent and self.resumable() and downloaded - self.saved > SAVE_EVERY:
+            f.flush()
+            self.save_state()
+
+    def downloaded(self) -> int:
+        return sum(pos - start for start, _, pos in self.state['segments']) if self.state else 0
+
+    def complete(self, segment: list) -> bool:
+        return segment[1] is not None and segment[2] >= segment[1]
+
+    def validator(self, state: dict = None) -> str:
+        # Weak ETags can't be used in If-Range (RFC 9110 13.1.5), servers must reply to them with the full file
+        state = state or self.state
+        etag = state.get('etag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return state.get('last_modified')
+
+    def resumable(self) -> bool:
+        return bool(self.state and self.state.get('resumable') and self.validator())
+
+    def load_state(self) -> dict:
+        try:
+            with open(self.state_filename) as f:
+                state = json.load(f)
+            if state.get('url') == self.url and state.get('resumable') and self.partial_filename.exists() and \
+                    self.validator(state):
+                self.reported = self.saved = sum(pos - start for start, _, pos in state['segments'])
+                return state
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            rts.set(self.ctx, f'INVALID PARTIAL DOWNLOAD STATE FOR {self.url}: {e!r}', 'error')
+        self.discard()
+        return None
+
+    def save_state(self):
+        if self.state is None:
+            return
+        self.saved = self.downloaded()
+        tmp_filename = self.state_filename.with_suffix('.tmp')
+        with open(tmp_filename, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_filename, self.state_filename)
+
+    def discard(self):
+        self.state = None
+        self.reported = self.saved = 0
+        for filename in (self.partial_filename, self.state_filename):
+            try:
+                os.unlink(filename)
+            except FileNotFoundError:
+                pass
+
+    def acquire(self) -> bool:
+        # An exclusive lock on the URL's partial file, across tasks and workers
+        self.lock_fd = os.open(self.lock_filename, os.O_CREAT | os.O_RDWR)
+        try:
+            fcntl.flock(self.lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            os.close(self.lock_fd)
+            self.lock_fd = None
+            return False
+
+    def release(self):
+        if self.lock_fd is not None:
+            fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+            os.close(self.lock_fd)
+            self.lock_fd = None
+
+    @classmethod
+    def cleanup(cls):
+        # Partial downloads of URLs that are never retried shouldn't pile up in the cache
+        if cls.cleaned_up:
+            return
+        cls.cleaned_up = True
+        threshold = time.time() - PARTIAL_MAX_AGE
+        for filename in PARTIAL_DIR.iterdir():
+            try:
+                if filename.stat().st_mtime < threshold:
+                    filename.unlink()
+            except Exception:
+                pass
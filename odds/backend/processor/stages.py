@@ -0,0 +1,85 @@
+import asyncio
+
+from ...common.config import config
+
+
+class Stage:
+
+    def __init__(self, name: str, limit: int) -> None:
+        self.name = name
+        self.limit = limit
+        self.sem: asyncio.Semaphore = None
+        self.waiting = 0
+        self.active = 0
+        self.done = 0
+
+    def set_limit(self, limit: int):
+        if limit and limit != self.limit and self.waiting == 0 and self.active == 0:
+            self.limit = limit
+            self.sem = None
+        return self
+
+    async def __aenter__(self):
+        if not self.sem:
+            self.sem = asyncio.Semaphore(self.limit)
+        self.waiting += 1
+        try:
+            await self.sem.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.active -= 1
+        self.done += 1
+        self.sem.release()
+        return False
+
+    def busy(self) -> bool:
+        return self.waiting > 0 or self.active > 0
+
+    def status(self) -> str:
+        return f'{self.name}: {self.active}/{self.limit} active, {self.waiting} queued, {self.done} done'
+
+
+class Stages:
+
+    # Default pool sizes, each can be overridden in odds.config.yaml:
+    # dataset_processor_stages:
+    #   io: 7
+    #   cpu: 3
+    #   llm: 3
+    #   embed: 8
+    DEFAULTS = dict(
+        io=7,
+        cpu=3,
+        llm=3,
+        embed=8,
+    )
+
+    def __init__(self) -> None:
+        stages_config = config.dataset_processor_stages
+        self.configured = set()
+        for name, limit in self.DEFAULTS.items():
+            if stages_config and stages_config.get(name):
+                limit = stages_config.get(name)
+                self.configured.add(name)
+            setattr(self, name, Stage(name, limit))
+
+        self.io: Stage
+        self.cpu: Stage
+        self.llm: Stage
+        self.embed: Stage
+
+    def all(self) -> list[Stage]:
+        return [getattr(self, name) for name in self.DEFAULTS]
+
+    def busy(self) -> bool:
+        return any(stage.busy() for stage in self.all())
+
+    def status(self) -> str:
+        return ' | '.join(stage.status() for stage in self.all())
+
+
+stages = Stages()
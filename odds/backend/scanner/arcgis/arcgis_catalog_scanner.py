@@ -1,10 +1,10 @@
 from typing import AsyncIterator
-import httpx
 
 from ....common.text_utils import html_to_markdown
 from ....common.config import config
 from ....common.datatypes import Dataset, DataCatalog, Resource
 from ....common.retry import Retry
+from ....common.http_client import http_clients
 from ....common.realtime_status import realtime_status as rts
 from ..catalog_scanner import CatalogScanner
 
@@ -27,7 +27,7 @@ class ArcGISCatalogScanner(CatalogScanner):
         num_rows = 0
         startindex = 1
         used_ids = set()
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client('fetch') as client:
             headers.update(self.catalog.http_headers)
             while True:
                 if config.debug:
@@ -1,10 +1,10 @@
 from typing import AsyncIterator
-import httpx
 import os
 
 from ....common.config import config
 from ....common.datatypes import Dataset, Resource, DataCatalog
 from ....common.retry import Retry
+from ....common.http_client import http_clients
 from ....common.realtime_status import realtime_status as rts
 from ..catalog_scanner import CatalogScanner
 from urllib.parse import quote
@@ -24,7 +24,7 @@ class CKANCatalogScanner(CatalogScanner):
     async def scan(self) -> AsyncIterator[Dataset]:
         page = 1
         num_rows = 0
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client('fetch') as client:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:124.0) Gecko/20100101 Firefox/124.0'
             }
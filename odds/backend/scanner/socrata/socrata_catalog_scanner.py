@@ -1,11 +1,11 @@
 from typing import AsyncIterator
-import httpx
 
 from ....common.text_utils import html_to_markdown
 from ....common.config import config
 from ....common.datatypes import Dataset, DataCatalog, Field
 from ....common.datatypes_socrata import SocrataResource
 from ....common.retry import Retry
+from ....common.http_client import http_clients
 from ....common.realtime_status import realtime_status as rts
 from ..catalog_scanner import CatalogScanner
 
@@ -28,7 +28,7 @@ class SocrataCatalogScanner(CatalogScanner):
         num_rows = 0
         offset = 0
         used_ids = set()
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client('fetch') as client:
             headers.update(self.catalog.http_headers)
             domain = self.catalog.url.split('//')[1].split('/')[0]
             while True:
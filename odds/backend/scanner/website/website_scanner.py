@@ -1,5 +1,4 @@
 from typing import AsyncIterator
-import httpx
 from hashlib import sha256
 
 from ....common.datatypes_website import WebsiteResource
@@ -7,6 +6,7 @@ from ....common.datatypes_website import WebsiteResource
 from ....common.config import config, CACHE_DIR
 from ....common.datatypes import Dataset, DataCatalog
 from ....common.retry import Retry
+from ....common.http_client import http_clients
 from ....common.realtime_status import realtime_status as rts
 from ..catalog_scanner import CatalogScanner
 
@@ -14,7 +14,6 @@ from ..catalog_scanner import CatalogScanner
 import asyncio
 import json
 from pathlib import Path
-import httpx
 from urllib.parse import urljoin
 import re
 import nh3
@@ -42,7 +41,6 @@ class Scraper:
         'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36'
     }
     WORKER_COUNT = 5
-    PERIOD = 0.25
     CACHE = CACHE_DIR / 'web-scraper'
     CACHE_HASHES = CACHE / 'hashes'
     WS = re.compile(r'\s+', re.UNICODE | re.MULTILINE)
@@ -109,8 +107,8 @@ class Scraper:
                 print(f'GOT FROM CACHE: {url} -> {final_url}')
 
         if content is None:
-            async with httpx.AsyncClient() as client:
-                await asyncio.sleep(self.PERIOD * self.WORKER_COUNT)
+            # Requests are paced per host by the shared client's rate limiter
+            async with http_clients.client('fetch') as client:
                 if self.fetcher_proxy:
                     r = await client.get(f'{self.fetcher_proxy}/fetch', params=dict(url=url), timeout=30)
                     r.raise_for_status()
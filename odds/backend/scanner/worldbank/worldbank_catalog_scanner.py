@@ -1,9 +1,9 @@
 from typing import AsyncIterator
-import httpx
 
 from ....common.config import config
 from ....common.datatypes import Dataset, Resource, DataCatalog
 from ....common.retry import Retry
+from ....common.http_client import http_clients
 from ....common.realtime_status import realtime_status as rts
 from ..catalog_scanner import CatalogScanner
 from ...settings import ALLOWED_FORMATS
@@ -22,7 +22,7 @@ class WorldBankCatalogScanner(CatalogScanner):
 
     async def scan(self) -> AsyncIterator[Dataset]:
         skip = 0
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client('fetch') as client:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:124.0) Gecko/20100101 Firefox/124.0'
             }
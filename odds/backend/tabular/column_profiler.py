@@ -0,0 +1,117 @@
+# Streaming, bounded-memory column statistics for the tabular loader.
+# Rows are buffered and processed column by column in batches, so most of the work
+# (counting, hashing, min/max) happens inside builtins rather than per cell in Python.
+from collections import Counter
+from typing import Any
+
+
+ORDERED_TYPES = ('number', 'integer', 'date', 'time', 'datetime')
+HASH_SPACE = 2 ** 64
+
+
+class ColumnProfile:
+
+    # Approximate top-k: the counter is pruned back to its heaviest entries when it grows too big
+    TOP_K_CAPACITY = 10000
+    TOP_K_PRUNE_TO = 1000
+    # Distinct values are estimated with a KMV (k minimum values) sketch,
+    # which is exact as long as there are fewer than DISTINCT_K distinct values
+    DISTINCT_K = 1024
+
+    def __init__(self, name: str, data_type: str) -> None:
+        self.name = name
+        self.data_type = data_type
+        self.count = 0
+        self.missing = 0
+        self.min_value = None
+        self.max_value = None
+        self.ordered = data_type in ORDERED_TYPES
+        self.hashable = True
+        self.top = Counter()
+        self.pruned = False
+        self.hashes = []
+
+    def update(self, values: list[Any]):
+        true_values = [x for x in values if x is not None]
+        self.count += len(values)
+        self.missing += len(values) - len(true_values)
+        if not true_values:
+            return
+        if self.ordered:
+            try:
+                low, high = min(true_values), max(true_values)
+                if self.min_value is None or low < self.min_value:
+                    self.min_value = low
+                if self.max_value is None or high > self.max_value:
+                    self.max_value = high
+            except:
+                self.ordered = False
+        if self.hashable:
+            try:
+                self.top.update(true_values)
+                # hashing 1-tuples mixes the value hashes (plain ints hash to themselves)
+                hashes = set(map(hash, zip(true_values)))
+            except TypeError:
+                self.hashable = False
+                self.top = Counter()
+                self.hashes = []
+                return
+            if len(self.top) > self.TOP_K_CAPACITY:
+                self.top = Counter(dict(self.top.most_common(self.TOP_K_PRUNE_TO)))
+                self.pruned = True
+            hashes.update(self.hashes)
+            self.hashes = sorted(hashes)[:self.DISTINCT_K]
+
+    def non_empty(self) -> bool:
+        return self.count > self.missing
+
+    def distinct_count(self) -> int:
+        if not self.hashable:
+            return None
+        if len(self.hashes) < self.DISTINCT_K:
+            return len(self.hashes)
+        # hash() values are signed, shift them to [0, 2^64) before normalizing
+        kth = (self.hashes[-1] + HASH_SPACE // 2) / HASH_SPACE
+        return int((self.DISTINCT_K - 1) / kth)
+
+    def sample_values(self, num=10) -> list[str]:
+        sample_values = [str(x) for x, _ in self.top.most_common(num)]
+        return [x for x in sample_values if len(x) < 100]
+
+    def profile(self) -> dict:
+        profile = dict(name=self.name, data_type=self.data_type)
+        if self.hashable:
+            profile['sample_values'] = self.sample_values()
+            profile['distinct_count'] = self.distinct_count()
+        if self.count > 0 and self.missing > 0:
+            profile['missing_values_percent'] = int(100 * self.missing / self.count)
+        if self.ordered and self.min_value is not None:
+            profile['max_value'] = str(self.max_value)
+            profile['min_value'] = str(self.min_value)
+        return profile
+
+
+class ColumnProfiler:
+
+    BATCH_SIZE = 5000
+
+    def __init__(self, fields: list[dict]) -> None:
+        self.columns = [ColumnProfile(field['name'], field['type']) for field in fields]
+        self.batch = []
+
+    def add(self, row: dict):
+        self.batch.append(row)
+        if len(self.batch) >= self.BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            batch = self.batch
+            self.batch = []
+            for column in self.columns:
+                name = column.name
+                column.update([row.get(name) for row in batch])
+
+    def profiles(self) -> list[dict]:
+        self.flush()
+        return [column.profile() for column in self.columns if column.non_empty()]
@@ -0,0 +1,213 @@
+# CPU-bound parts of the tabular pipeline.
+# These functions are executed either in a worker thread or in a separate process
+# (see ResourceProcessor.run_cpu), so they only deal with plain, picklable values
+# and must not import anything with side effects at import time (realtime status,
+# metadata store etc.) - progress is reported through the optional `progress` callback.
+import csv
+import datetime
+import decimal
+import json
+import sqlite3
+import time
+from typing import Any, Callable
+
+import dataflows as DF
+
+from .column_profiler import ColumnProfiler
+
+
+csv.field_size_limit(10000000)
+
+REPORT_EVERY = 100000
+CHECK_EVERY = 10000
+BATCH_SIZE = 1000
+
+SQLITE_TYPES = {
+    'integer': 'INTEGER',
+    'year': 'INTEGER',
+    'number': 'FLOAT',
+    'boolean': 'BOOLEAN',
+    'date': 'DATE',
+    'datetime': 'DATETIME',
+    'time': 'TIME',
+}
+
+
+class TooManyFields(Exception):
+
+    def __init__(self, num_fields) -> None:
+        super().__init__(f'TOO MANY FIELDS - {num_fields}')
+        self.num_fields = num_fields
+
+
+def checker(deadline: float = None, progress: Callable[[str], None] = None, message: Callable[[int], str] = None):
+    # Gracefully abort long running flows once their deadline has passed,
+    # instead of leaving a runaway thread/process behind
+    def func(rows):
+        for i, row in enumerate(rows):
+            if i % CHECK_EVERY == 0:
+                if deadline is not None and time.time() > deadline:
+                    raise TimeoutError(f'Deadline exceeded after {i} rows')
+                if progress is not None and i % REPORT_EVERY == 0:
+                    progress(message(i))
+            yield row
+    return func
+
+
+def select_columns(profiles: list[dict]) -> list[str]:
+    # if all values in the sample are the same, no need for this field in the db
+    return [
+        profile['name'] for profile in profiles
+        if len(profile.get('sample_values', [])) != 1
+    ]
+
+
+def sqlite_value(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+    if isinstance(value, datetime.time):
+        return value.strftime('%H:%M:%S.%f')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str, ensure_ascii=False)
+    return str(value)
+
+
+class SQLiteWriter:
+
+    def __init__(self, sqlite_filename: str, sample_size: int, max_fields: int):
+        self.sqlite_filename = sqlite_filename
+        self.sample_size = sample_size
+        self.max_fields = max_fields
+        self.fields = []
+        self.sample = []
+        self.profiles = []
+        self.profiler: ColumnProfiler = None
+        self.columns = None
+        self.db_schema = None
+        self.row_count = 0
+        self.conn: sqlite3.Connection = None
+        self.batch = []
+
+    def processor(self):
+        def func(package):
+            yield package.pkg
+            for resource in package:
+                self.fields = [
+                    dict(name=field['name'], type=field['type'])
+                    for field in resource.res.descriptor['schema']['fields']
+                ]
+                self.profiler = ColumnProfiler(self.fields)
+                yield self.write(resource)
+        return func
+
+    def write(self, rows):
+        for row in rows:
+            self.profiler.add(row)
+            if self.columns is None:
+                self.sample.append(row)
+                if len(self.sample) >= self.sample_size:
+                    self.start()
+            else:
+                self.add(row)
+            yield row
+        if self.columns is None and len(self.sample) > 0:
+            self.start()
+
+    def start(self):
+        # The sample is complete - decide which fields go into the db based on the
+        # statistics collected so far, create the table and flush the buffered rows into it
+        self.profiles = self.profiler.profiles()
+        columns = select_columns(self.profiles)
+        for profile in self.profiles:
+            profile['in_db'] = profile['name'] in columns
+        if len(columns) > self.max_fields:
+            raise TooManyFields(len(columns))
+        types = dict((field['name'], field['type']) for field in self.fields)
+        self.columns = columns
+        assert len(self.columns) > 0, 'No fields with varying values'
+        columns = ', \n\t'.join(
+            '"{}" {}'.format(name.replace('"', '""'), SQLITE_TYPES.get(types[name], 'TEXT'))
+            for name in self.columns
+        )
+        self.db_schema = f'CREATE TABLE data (\n\t{columns}\n)'
+        self.conn = sqlite3.connect(self.sqlite_filename, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode = OFF')
+        self.conn.execute('PRAGMA synchronous = OFF')
+        self.conn.execute('BEGIN')
+        self.conn.execute(self.db_schema)
+        self.insert = 'INSERT INTO data VALUES ({})'.format(', '.join('?' for _ in self.columns))
+        for row in self.sample:
+            self.add(row)
+        self.sample = []
+
+    def finish(self) -> list[dict]:
+        # Field statistics cover the whole file, while the set of fields
+        # (and which of them are in the db) is the one decided on the sample
+        if self.columns is None:
+            return self.profiles
+        profiles = dict((profile['name'], profile) for profile in self.profiler.profiles())
+        return [
+            dict(profiles[profile['name']], in_db=profile['in_db'])
+            for profile in self.profiles
+        ]
+
+    def add(self, row):
+        self.batch.append(tuple(sqlite_value(row.get(name)) for name in self.columns))
+        self.row_count += 1
+        if len(self.batch) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.conn.executemany(self.insert, self.batch)
+            self.batch = []
+
+    def close(self):
+        if self.conn is not None:
+            self.flush()
+            self.conn.execute('COMMIT')
+            self.conn.close()
+            self.conn = None
+
+    def abort(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def load_tabular(filename: str, sqlite_filename: str, missing_values: list[str], sample_size: int, max_fields: int,
+                 deadline: float = None, progress: Callable[[str], None] = None) -> dict:
+    # Single pass over the file: rows are validated, profiled and streamed
+    # into the SQLite db in batches, all inside one transaction.
+    writer = SQLiteWriter(sqlite_filename, sample_size, max_fields)
+    try:
+        DF.Flow(
+            DF.load(filename,
+                    override_schema={'missingValues': missing_values},
+                    deduplicate_headers=True,
+                    deduplicate_headers_case_sensitive=False,
+                    deduplicate_headers_format='__%s',
+                    # http_timeout=60
+            ),
+            DF.update_resource(-1, name='data'),
+            DF.validate(on_error=DF.schema_validator.clear),
+            checker(deadline, progress, lambda i: f'LOADED {i} ROWS TO SQLITE'),
+            writer.processor(),
+        ).process()
+        writer.close()
+    except Exception as e:
+        writer.abort()
+        cause = getattr(e, 'cause', None) or e
+        if isinstance(cause, TooManyFields):
+            return dict(fields=writer.profiles, row_count=None, db_schema=None, too_many_fields=cause.num_fields)
+        # dataflows' ProcessorError can't be pickled, so it's not passed as is back from a worker process
+        if isinstance(cause, TimeoutError):
+            raise TimeoutError(str(cause)) from None
+        raise RuntimeError(repr(cause)) from None
+    return dict(fields=writer.finish(), row_count=writer.row_count, db_schema=writer.db_schema, too_many_fields=None)
@@ -0,0 +1,53 @@
+import redis
+
+from .sqlite_lru_cache import CacheStats
+
+
+class RedisCache:
+
+    # A key/value cache shared by all nodes. Entries expire after ttl seconds,
+    # eviction beyond that is left to the server's maxmemory-policy (e.g. allkeys-lru).
+
+    def __init__(self, name: str, url: str, prefix: str, ttl: float = None) -> None:
+        self.redis = redis.Redis.from_url(url, socket_timeout=5)
+        self.prefix = prefix
+        self.ttl = int(ttl) if ttl else None
+        self.stats = CacheStats(name)
+
+    def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        if not keys:
+            return {}
+        try:
+            values = self.redis.mget([f'{self.prefix}:{key}' for key in keys])
+        except redis.RedisError as e:
+            print('REDIS CACHE ERROR', repr(e))
+            values = [None] * len(keys)
+        found = dict()
+        for key, value in zip(keys, values):
+            if value is not None:
+                found[key] = value
+            self.stats.update(value is not None, len(value or b''))
+        return found
+
+    def get(self, key: str) -> bytes:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: dict[str, bytes]):
+        if not items:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.set(f'{self.prefix}:{key}', value, ex=self.ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            print('REDIS CACHE ERROR', repr(e))
+            return
+        for value in items.values():
+            self.stats.written(len(value))
+
+    def set(self, key: str, value: bytes):
+        self.set_many({key: value})
+
+    def close(self):
+        self.redis.close()
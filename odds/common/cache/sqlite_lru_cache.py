@@ -0,0 +1,166 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class CacheStats:
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def update(self, hit: bool, size: int = 0):
+        if hit:
+            self.hits += 1
+            self.bytes_read += size
+        else:
+            self.misses += 1
+
+    def written(self, size: int):
+        self.bytes_written += size
+
+    def __str__(self) -> str:
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0
+        return f'{self.name}: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate), {self.bytes_read} bytes read, {self.bytes_written} bytes written'
+
+
+class MemoryLRUCache:
+
+    def __init__(self, name: str, max_items: int) -> None:
+        self.max_items = max_items
+        self.items: OrderedDict[str, bytes] = OrderedDict()
+        self.stats = CacheStats(name)
+
+    def get(self, key: str) -> bytes:
+        value = self.items.get(key)
+        self.stats.update(value is not None, len(value) if value is not None else 0)
+        if value is not None:
+            self.items.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+
+
+class SQLiteLRUCache:
+
+    # A size-bounded key/value cache on local disk, safe to share between processes.
+    # Access times are only refreshed when they're older than TOUCH_INTERVAL,
+    # so that reads don't turn into a write each.
+    # With a ttl, entries also expire that many seconds after they were stored.
+    # Its methods block (waiting on other processes' locks), so async callers run them in a worker thread;
+    # the connection is shared by these threads, one at a time.
+    TOUCH_INTERVAL = 3600
+    EVICT_CHECK_EVERY = 1000
+    EVICT_TO = 0.9
+
+    def __init__(self, name: str, path: Path, max_bytes: int, ttl: float = None) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats(name)
+        self.conn: sqlite3.Connection = None
+        self.lock = threading.RLock()
+        self.writes = 0
+
+    def connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            self.conn.execute('PRAGMA journal_mode = WAL')
+            self.conn.execute('PRAGMA synchronous = NORMAL')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, size INTEGER, accessed REAL, created REAL)')
+            columns = [row[1] for row in self.conn.execute('PRAGMA table_info(cache)')]
+            if 'created' not in columns:
+                self.conn.execute('ALTER TABLE cache ADD COLUMN created REAL')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+        return self.conn
+
+    def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        if not keys:
+            return {}
+        with self.lock:
+            conn = self.connect()
+            now = time.time()
+            found = dict()
+            stale = []
+            # Stay well below sqlite's limit on the number of parameters
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = conn.execute(
+                    'SELECT key, value, accessed, created FROM cache WHERE key IN ({})'.format(', '.join('?' for _ in batch)), batch
+                ).fetchall()
+                for key, value, accessed, created in rows:
+                    if self.ttl and created and now - created > self.ttl:
+                        continue
+                    found[key] = value
+                    if now - accessed > self.TOUCH_INTERVAL:
+                        stale.append(key)
+            if stale:
+                conn.executemany('UPDATE cache SET accessed = ? WHERE key = ?', [(now, key) for key in stale])
+                conn.commit()
+            for key in keys:
+                self.stats.update(key in found, len(found.get(key) or b''))
+            return found
+
+    def get(self, key: str) -> bytes:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: dict[str, bytes]):
+        if not items:
+            return
+        with self.lock:
+            conn = self.connect()
+            now = time.time()
+            conn.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, size, accessed, created) VALUES (?, ?, ?, ?, ?)',
+                [(key, value, len(value), now, now) for key, value in items.items()]
+            )
+            conn.commit()
+            for value in items.values():
+                self.stats.written(len(value))
+            self.writes += len(items)
+            if self.writes >= self.EVICT_CHECK_EVERY:
+                self.writes = 0
+                self.evict()
+
+    def set(self, key: str, value: bytes):
+        self.set_many({key: value})
+
+    def evict(self):
+        with self.lock:
+            conn = self.connect()
+            if self.ttl:
+                conn.execute('DELETE FROM cache WHERE created < ?', (time.time() - self.ttl,))
+                conn.commit()
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            target = self.max_bytes * self.EVICT_TO
+            while total > target:
+                rows = conn.execute('SELECT key, size FROM cache ORDER BY accessed LIMIT 1000').fetchall()
+                if not rows:
+                    break
+                evicted = []
+                for key, size in rows:
+                    evicted.append((key,))
+                    total -= size
+                    if total <= target:
+                        break
+                conn.executemany('DELETE FROM cache WHERE key = ?', evicted)
+                conn.commit()
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
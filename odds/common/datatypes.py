@@ -1,3 +1,5 @@
+import hashlib
+import json
 from typing import Any, Dict, List, Literal
 from dataclasses import dataclass, field, asdict, fields, is_dataclass
 import numpy as np
@@ -13,6 +15,7 @@ class Field(Interface):
     missing_values_percent: float = None
     max_value: Any = None
     min_value: Any = None
+    distinct_count: int = None
 
 
 @dataclass
@@ -29,8 +32,13 @@ class Resource(Interface):
     loading_error: str = None
     kind: str = 'base'
     content: str = None
-    chunks: list[dict] = None
+    chunk_ids: list[str] = None
     quality_issues: list[Dict[str, str]] = field(default_factory=list)
+    etag: str = None
+    last_modified: str = None
+    content_size: int = None
+    content_hash: str = None
+    content_key: str = None
 
     def merge(self, updates: 'Resource'):
         for field in fields(self):
@@ -74,9 +82,17 @@ class Dataset(Interface):
     versions: dict = field(default_factory=dict)
 
     last_updated: str = None
+    fingerprint: str = None
 
     def storeId(self):
         return f"{self.catalogId}__{self.id}"
+
+    def content_fingerprint(self) -> str:
+        # A hash of everything that's stored for the dataset, to skip writes which wouldn't change anything
+        data = asdict(self)
+        data.pop('fingerprint')
+        data.pop('last_updated')
+        return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
     
     def merge(self, updates: 'Dataset'):
         for field in fields(self):
@@ -1,9 +1,9 @@
 import os
-import httpx
 
 from .config import config, CACHE_DIR
 from .datatypes import Resource
 from .retry import Retry
+from .http_client import http_clients
 from .realtime_status import realtime_status as rts
 
 from io import StringIO
@@ -31,7 +31,7 @@ class SocrataResource(Resource):
         if not out_filename.exists():
             if config.debug:
                 rts.set(ctx, f"Caching socrata resource to {out_filename}")
-            async with httpx.AsyncClient() as client:
+            async with http_clients.client('fetch') as client:
                 out_filename = str(out_filename)
                 with open(out_filename + ONGOING_SUFFIX, 'w') as f:
                     loaded = False
@@ -2,8 +2,9 @@ import atexit
 
 from .embedder import Embedder
 from .openai.openai_embedder import OpenAIEmbedder
+from .cached_embedder import CachedEmbedder
 from ..select import select
 
-embedder: Embedder = select('Embedder', locals())()
+embedder: Embedder = CachedEmbedder(select('Embedder', locals())())
 
 atexit.register(embedder.print_total_usage)
\ No newline at end of file
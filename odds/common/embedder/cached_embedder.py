@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+from typing import Optional
+
+import numpy as np
+
+from ..datatypes import Embedding
+from ..config import config, CACHE_DIR
+from ..cache.sqlite_lru_cache import MemoryLRUCache, SQLiteLRUCache
+from .embedder import Embedder
+
+
+class CachedEmbedder(Embedder):
+
+    # Wraps the selected embedder with a persistent embedding cache keyed by (model, dimensions, sha256(text)).
+    # Configurable in odds.config.yaml:
+    # embedding_cache:
+    #   max_size_mb: 2048
+    #   memory_items: 10000
+    MAX_SIZE_MB = 2048
+    MEMORY_ITEMS = 10000
+
+    def __init__(self, embedder: Embedder):
+        super().__init__()
+        self.embedder = embedder
+        cache_config = config.embedding_cache
+        max_size_mb = (cache_config and cache_config.max_size_mb) or self.MAX_SIZE_MB
+        memory_items = self.MEMORY_ITEMS if not cache_config or cache_config.memory_items is None else cache_config.memory_items
+        self.disk = SQLiteLRUCache('embedding cache (disk)', CACHE_DIR / 'embedding-cache.sqlite', max_size_mb * 1024 * 1024)
+        self.memory = MemoryLRUCache('embedding cache (memory)', memory_items) if memory_items else None
+
+    def key(self, text: str) -> str:
+        text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        return f'{self.embedder.model()}:{self.vector_size()}:{text_hash}'
+
+    async def embed_many(self, texts: list[str]) -> list[Optional[Embedding]]:
+        keys = [self.key(text) for text in texts]
+        found: dict[str, bytes] = dict()
+        if self.memory is not None:
+            for key in keys:
+                value = self.memory.get(key)
+                if value is not None:
+                    found[key] = value
+        missing = list(set(key for key in keys if key not in found))
+        # The disk cache blocks on SQLite locks held by other processes, so it's used from a worker thread
+        from_disk = await asyncio.to_thread(self.disk.get_many, missing)
+        found.update(from_disk)
+        if self.memory is not None:
+            for key, value in from_disk.items():
+                self.memory.set(key, value)
+
+        # Only embed each missing text once, even if it appears several times
+        to_embed = dict()
+        for key, text in zip(keys, texts):
+            if key not in found:
+                to_embed.setdefault(key, text)
+        if to_embed:
+            embeddings = await self.embedder.embed_many(list(to_embed.values()))
+            new_items = dict()
+            for key, embedding in zip(to_embed.keys(), embeddings):
+                if embedding is not None:
+                    new_items[key] = np.asarray(embedding, dtype=np.float32).tobytes()
+            await asyncio.to_thread(self.disk.set_many, new_items)
+            found.update(new_items)
+            if self.memory is not None:
+                for key, value in new_items.items():
+                    self.memory.set(key, value)
+
+        return [
+            np.frombuffer(found[key], dtype=np.float32).copy() if key in found else None
+            for key in keys
+        ]
+
+    def model(self) -> str:
+        return self.embedder.model()
+
+    def vector_size(self) -> int:
+        return self.embedder.vector_size()
+
+    def print_total_usage(self) -> None:
+        self.embedder.print_total_usage()
+        if self.memory is not None:
+            print(self.memory.stats)
+        print(self.disk.stats)
@@ -1,14 +1,109 @@
+import asyncio
 from typing import Optional
 from ...common.datatypes import Embedding
 
 
+class InvalidEmbeddingInput(Exception):
+    # Raised by embed_batch when the provider rejected the batch's input (e.g. HTTP 400)
+    pass
+
+
 class Embedder:
 
+    MODEL = None
+    # Batching limits for embed_many, subclasses adjust them to their provider's API
+    MAX_BATCH_SIZE = 128
+    MAX_BATCH_TOKENS = 50000
+    MAX_CONCURRENT_BATCHES = 4
+    # Concurrent single-text embed() calls made within this window are sent as one batch
+    COALESCE_WINDOW = 0.005
+
+    sem: asyncio.Semaphore = None
+
+    def __init__(self):
+        self.pending: list[tuple[str, asyncio.Future]] = None
+        self.pending_task: asyncio.Task = None
+
     async def embed(self, text: str) -> Optional[Embedding]:
+        if self.pending is None:
+            self.pending = []
+            self.pending_task = asyncio.create_task(self.embed_pending())
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((text, future))
+        return await future
+
+    async def embed_pending(self):
+        await asyncio.sleep(self.COALESCE_WINDOW)
+        pending, self.pending = self.pending, None
+        try:
+            embeddings = await self.embed_many([text for text, _ in pending])
+            for (_, future), embedding in zip(pending, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def embed_many(self, texts: list[str]) -> list[Optional[Embedding]]:
+        # Returns an embedding per text, None for texts which failed to embed
+        results: list[Optional[Embedding]] = [None] * len(texts)
+        if not texts:
+            return results
+        if self.sem is None:
+            Embedder.sem = asyncio.Semaphore(self.MAX_CONCURRENT_BATCHES)
+
+        async def run(batch: list[int]):
+            async with self.sem:
+                embeddings = await self.embed_bisect([texts[i] for i in batch])
+            for i, embedding in zip(batch, embeddings):
+                results[i] = embedding
+
+        await asyncio.gather(*[run(batch) for batch in self.batches(texts)])
+        return results
+
+    async def embed_bisect(self, texts: list[str]) -> list[Optional[Embedding]]:
+        # A rejected batch is split in two and retried, so that a single bad input
+        # only loses its own embedding and not the whole batch.
+        # Other failures (transport errors, rate limits, server errors) would fail the halves as well, so they propagate
+        try:
+            return await self.embed_batch(texts)
+        except InvalidEmbeddingInput as e:
+            if len(texts) == 1:
+                print('FAILED TO EMBED', repr(texts[0][:100]), repr(e))
+                return [None]
+            middle = len(texts) // 2
+            return await self.embed_bisect(texts[:middle]) + await self.embed_bisect(texts[middle:])
+
+    def batches(self, texts: list[str]) -> list[list[int]]:
+        batches = []
+        batch = []
+        batch_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = self.estimate_tokens(text)
+            if batch and (len(batch) >= self.MAX_BATCH_SIZE or batch_tokens + tokens > self.MAX_BATCH_TOKENS):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(i)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        # A conservative estimate, non latin scripts take more tokens per character
+        return len(text) // 2 + 1
+
+    async def embed_batch(self, texts: list[str]) -> list[Optional[Embedding]]:
         pass
 
+    def model(self) -> str:
+        return self.MODEL or type(self).__name__
+
     def vector_size(self) -> int:
         pass
 
     def print_total_usage(self) -> None:
-        pass
\ No newline at end of file
+        pass
@@ -1,14 +1,25 @@
 from typing import Optional
-import httpx
 import numpy as np
 import math
 
 from ...datatypes import Embedding
 
-from ..embedder import Embedder
+from httpx import Response
+
+from ..embedder import Embedder, InvalidEmbeddingInput
 from ...cost_collector import CostCollector
 from ...config import config
 from ...retry import Retry
+from ...http_client import http_clients
+
+
+class EmbeddingRetry(Retry):
+
+    def test_response(self, response: Response) -> None:
+        # Invalid input isn't retried, but is returned so that the batch can be bisected
+        if response.status_code == 400:
+            return response
+        return super().test_response(response)
 
 
 class OpenAIEmbedder(Embedder):
@@ -16,12 +27,17 @@ class OpenAIEmbedder(Embedder):
     MODEL = 'text-embedding-3-small'
     VECTOR_SIZE = 1536
     COST = 0.02/1000000
+    # The API accepts up to 2048 inputs and 300K tokens per request
+    MAX_BATCH_SIZE = 256
+    MAX_BATCH_TOKENS = 100000
 
     def __init__(self):
         super().__init__()
         self.cost = CostCollector('openai', {'embed': {'tokens': self.COST}})
+        # text-embedding-3 models can return shortened vectors (e.g. 512 dimensions)
+        self.dimensions = config.embeddings and config.embeddings.dimensions
 
-    async def embed(self, text: str) -> Optional[Embedding]:
+    async def embed_batch(self, texts: list[str]) -> list[Optional[Embedding]]:
         headers = {
             'Authorization': f'Bearer {config.credentials.openai.key}',
             'OpenAI-Organization': config.credentials.openai.org,
@@ -29,30 +45,36 @@ class OpenAIEmbedder(Embedder):
         }
         request = dict(
             model=self.MODEL,
-            input=text,
+            input=texts,
         )
-        async with httpx.AsyncClient() as client:
-            response = await Retry()(client, 'post',
+        if self.dimensions:
+            request['dimensions'] = self.dimensions
+        async with http_clients.client('api') as client:
+            response = await EmbeddingRetry()(client, 'post',
                 'https://api.openai.com/v1/embeddings',
                 json=request,
                 headers=headers,
                 timeout=60,
             )
-            if response:
-                response.raise_for_status()
-                result = response.json()
-                if result['usage']:
-                    # self.cost.start_transaction()
-                    self.cost.update_cost('embed', 'tokens', result['usage']['total_tokens'])
-                    # self.cost.end_transaction()
-                if result.get('data') and result['data'][0].get('object') == 'embedding' and result['data'][0]['embedding']:
-                    vector: list[float] = result['data'][0]['embedding']
-                    embedding: Embedding = np.array(vector, dtype=np.float32)
-                    return embedding
-            return None
+            if response is None:
+                raise ValueError(f'Failed to embed a batch of {len(texts)} texts')
+            if response.status_code == 400:
+                raise InvalidEmbeddingInput(response.text[:300])
+            response.raise_for_status()
+            result = response.json()
+            if result['usage']:
+                # self.cost.start_transaction()
+                self.cost.update_cost('embed', 'tokens', result['usage']['total_tokens'])
+                # self.cost.end_transaction()
+            embeddings: list[Optional[Embedding]] = [None] * len(texts)
+            for item in result.get('data') or []:
+                if item.get('object') == 'embedding' and item.get('embedding'):
+                    vector: list[float] = item['embedding']
+                    embeddings[item['index']] = np.array(vector, dtype=np.float32)
+            return embeddings
     
     def print_total_usage(self):
         self.cost.print_total_usage()
 
     def vector_size(self) -> int:
-        return self.VECTOR_SIZE
\ No newline at end of file
+        return self.dimensions or self.VECTOR_SIZE
\ No newline at end of file
@@ -1,12 +1,17 @@
 from .datatypes import DataCatalog, Dataset
 from .store import store
-from .metadata_store import metadata_store
+from .metadata_store import Projection
 from .config import config
 
 
 class DatasetFilter:
-    async def consider(self, dataset: Dataset) -> bool:
+    async def consider(self, dataset: Dataset, exists: bool) -> bool:
+        # `exists` tells whether the dataset is already in the metadata store (looked up for the whole scan batch)
         return False
+
+    def projection(self) -> Projection:
+        # The parts of the existing datasets which `consider` needs
+        return Projection.IDS
     
     async def analyze(self, dataset: Dataset) -> bool:
         return True
@@ -29,7 +34,10 @@ class DatasetFilterIncomplete(DatasetFilter):
     def __init__(self) -> None:
         super().__init__()
 
-    async def consider(self, dataset: Dataset) -> bool:
+    def projection(self) -> Projection:
+        return Projection.STATUS
+
+    async def consider(self, dataset: Dataset, exists: bool) -> bool:
         if await self.analyze(dataset):
             return True
         if await self.describe(dataset):
@@ -59,6 +67,7 @@ class DatasetFilterIncomplete(DatasetFilter):
         return dataset.better_title is not None and (
             dataset.status_embedding is None or
             dataset.versions.get('embedder') != config.feature_versions.embedder or
+            any(resource.status_loaded and resource.chunk_ids is None for resource in dataset.resources) or
             await store.getEmbedding(dataset) is None
         )
     
@@ -68,15 +77,18 @@ class DatasetFilterIncomplete(DatasetFilter):
 
 class DatasetFilterNew(DatasetFilter):
 
-    async def consider(self, dataset: Dataset) -> bool:
-        return not await metadata_store.hasDataset(self.dataset.storeId())
+    async def consider(self, dataset: Dataset, exists: bool) -> bool:
+        return not exists
 
 
 class DatasetFilterForce(DatasetFilter):
 
-    async def consider(self, dataset: Dataset) -> bool:
+    async def consider(self, dataset: Dataset, exists: bool) -> bool:
         return True
 
+    def projection(self) -> Projection:
+        return Projection.FULL
+
     async def force_resources(self, dataset: Dataset) -> bool:
         return True
 
@@ -85,7 +97,7 @@ class DatasetFilterById(DatasetFilter):
         super().__init__()
         self.datasetId = datasetId
 
-    async def consider(self, dataset: Dataset) -> bool:
+    async def consider(self, dataset: Dataset, exists: bool) -> bool:
         return dataset.id == self.datasetId
 
     async def force_resources(self, dataset: Dataset) -> bool:
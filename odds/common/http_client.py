@@ -0,0 +1,76 @@
+import asyncio
+from contextlib import asynccontextmanager
+import weakref
+
+import httpx
+
+from .config import config
+from .rate_limiter import rate_limiter
+
+try:
+    import h2
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+
+class HTTPClients:
+
+    # Process-wide pooled clients, one per profile and event loop, so that connections
+    # (and TLS sessions) are reused across calls instead of a new client per request.
+    # Each profile can be tuned in odds.config.yaml:
+    # http_clients:
+    #   api:
+    #     max_connections: 50
+    PROFILES = dict(
+        # Data portals, catalogs and scraped websites: many hosts, big streamed downloads, limited per host
+        fetch=dict(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30, http2=False, rate_limit=True),
+        # Model providers: a few hosts with many small concurrent requests
+        api=dict(max_connections=50, max_keepalive_connections=50, keepalive_expiry=120, http2=True, rate_limit=False),
+    )
+
+    def __init__(self) -> None:
+        self.clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]] = weakref.WeakKeyDictionary()
+
+    def options(self, profile: str) -> dict:
+        options = dict(self.PROFILES[profile])
+        profile_config = config.http_clients and config.http_clients.get(profile)
+        if profile_config:
+            options.update(profile_config)
+        return options
+
+    def create(self, profile: str) -> httpx.AsyncClient:
+        options = self.options(profile)
+        limits = httpx.Limits(
+            max_connections=options['max_connections'],
+            max_keepalive_connections=options['max_keepalive_connections'],
+            keepalive_expiry=options['keepalive_expiry'],
+        )
+        return httpx.AsyncClient(
+            limits=limits,
+            http2=HTTP2 and options['http2'],
+            timeout=60,
+            event_hooks=rate_limiter.event_hooks() if options['rate_limit'] else None,
+        )
+
+    def get(self, profile: str = 'fetch') -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        clients = self.clients.setdefault(loop, {})
+        client = clients.get(profile)
+        if client is None or client.is_closed:
+            client = clients[profile] = self.create(profile)
+        return client
+
+    @asynccontextmanager
+    async def client(self, profile: str = 'fetch'):
+        # Drop-in for `async with httpx.AsyncClient() as client:` which doesn't close the shared client
+        yield self.get(profile)
+
+    async def aclose(self):
+        loop = asyncio.get_running_loop()
+        clients = self.clients.pop(loop, {})
+        for client in clients.values():
+            await client.aclose()
+
+
+http_clients = HTTPClients()
@@ -7,4 +7,5 @@ from ..select import select
 llm_runner: LLMRunner = select('LLMRunner', locals())()
 
 atexit.register(llm_runner.cache.dump_log)
-atexit.register(llm_runner.cost_collector.print_total_usage)
\ No newline at end of file
+atexit.register(llm_runner.cost_collector.print_total_usage)
+atexit.register(llm_runner.cache.print_stats)
\ No newline at end of file
@@ -1,16 +1,31 @@
+import asyncio
 import os
 import json
 import hashlib
-from kvfile.kvfile_leveldb import KVFileLevelDB as KVFile
 from ..config import config, CACHE_DIR
+from ..cache.sqlite_lru_cache import SQLiteLRUCache
 
 class LLMCache():
 
+    # Responses are cached by runner, model and request - in a local SQLite file by default
+    # (LRU and TTL evicted, shared by all processes on the node), or in Redis to share them between nodes.
+    # Configurable in odds.config.yaml:
+    # llm_cache:
+    #   backend: sqlite       # sqlite / redis / none
+    #   max_size_mb: 1024
+    #   ttl_days: 90
+    #   redis_url: redis://redis:6379/0
+    BACKEND = 'sqlite'
+    MAX_SIZE_MB = 1024
+    TTL_DAYS = 90
+    REDIS_URL = 'redis://redis:6379/0'
+    HASH_CHUNK_SIZE = 1024 * 1024
+
     def __init__(self, name) -> None:
+        self.name = name
         self.log = None
         self.cache = None
         self.logfile = None
-        self.cache_name = None
         if config.debug:
             self.role = os.environ.get('ROLE')
             cache_dir = CACHE_DIR
@@ -18,14 +33,19 @@ class LLMCache():
                 cache_dir = cache_dir / self.role
             self.logfile = (cache_dir / f'{name}_llm_runner.log').open('w')
             self.log = {}
-            self.cache_name = name
 
     def ensure_cache(self):
-        if self.cache is None and self.cache_name is not None:
-            location = CACHE_DIR
-            if self.role is not None:
-                location = location / self.role
-            self.cache = KVFile(location=str(location / f'{self.cache_name}_llm_runner.cache'))
+        if self.cache is None:
+            cache_config = config.llm_cache
+            backend = (cache_config and cache_config.backend) or self.BACKEND
+            ttl = ((cache_config and cache_config.ttl_days) or self.TTL_DAYS) * 86400
+            if backend == 'redis':
+                from ..cache.redis_cache import RedisCache
+                url = (cache_config and cache_config.redis_url) or self.REDIS_URL
+                self.cache = RedisCache(f'{self.name} llm cache (redis)', url, 'odds:llm-cache', ttl)
+            elif backend == 'sqlite':
+                max_size_mb = (cache_config and cache_config.max_size_mb) or self.MAX_SIZE_MB
+                self.cache = SQLiteLRUCache(f'{self.name} llm cache', CACHE_DIR / 'llm-cache.sqlite', max_size_mb * 1024 * 1024, ttl)
         return self.cache
 
     def store_log(self, conversation, prompts):
@@ -50,28 +70,57 @@ class LLMCache():
                     self.aux_log_writer(v, f'{breadcrumbs}.{k}')
 
     def dump_log(self):
-        print('DUMPING LOG', self.logfile, len(self.log))
         if self.logfile:
+            print('DUMPING LOG', self.logfile, len(self.log))
             for k in self.log.keys():
                 self.aux_log_writer(self.log[k])
             self.logfile.close()
 
-    def cache_key(self, request):
-        key = json.dumps(request, sort_keys=True)
-        key = hashlib.md5(key.encode()).hexdigest()
-        return key
+    def cache_key(self, request, payloads: list[tuple[str, str]] = []):
+        # The request is hashed as it's walked, without serializing it first.
+        # `payloads` are (value, digest) pairs of big values (e.g. attached files) whose digest is hashed instead
+        h = hashlib.md5()
+        self.hash_value(h, request, payloads)
+        return f'{self.name}:{request.get("model")}:{h.hexdigest()}'
+
+    def hash_value(self, h, value, payloads: list[tuple[str, str]]):
+        if isinstance(value, dict):
+            h.update(b'{')
+            for k in sorted(value.keys()):
+                self.hash_value(h, k, payloads)
+                self.hash_value(h, value[k], payloads)
+            h.update(b'}')
+        elif isinstance(value, (list, tuple)):
+            h.update(b'[')
+            for item in value:
+                self.hash_value(h, item, payloads)
+            h.update(b']')
+        elif isinstance(value, str):
+            for payload, digest in payloads:
+                if value is payload:
+                    h.update(f'#{len(digest)}:{digest}'.encode('utf-8'))
+                    return
+            h.update(f's{len(value)}:'.encode('utf-8'))
+            for i in range(0, len(value), self.HASH_CHUNK_SIZE):
+                h.update(value[i:i + self.HASH_CHUNK_SIZE].encode('utf-8'))
+        else:
+            h.update(f'{type(value).__name__}:{json.dumps(value)};'.encode('utf-8'))
 
-    def get_cache(self, request):
+    # The cache backends do blocking I/O (SQLite locks, Redis round trips), so they're called from a worker thread
+
+    async def get_cache(self, key):
         cache = self.ensure_cache()
         if cache is not None:
-            key = self.cache_key(request)
-            value = cache.get(key, default=None)
+            value = await asyncio.to_thread(cache.get, key)
             if value is not None:
-                return value
+                return value.decode('utf-8')
         return None
 
-    def set_cache(self, request, content):
+    async def set_cache(self, key, content):
         cache = self.ensure_cache()
         if cache is not None:
-            key = self.cache_key(request)
-            cache.set(key, content)
\ No newline at end of file
+            await asyncio.to_thread(cache.set, key, content.encode('utf-8'))
+
+    def print_stats(self):
+        if self.cache is not None:
+            print(self.cache.stats)
\ No newline at end of file
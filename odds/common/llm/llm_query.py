@@ -26,6 +26,14 @@ class LLMQuery():
     def max_tokens(self) -> int:
         return 2048
 
+    def cacheable(self) -> bool:
+        # Queries whose responses shouldn't be reused return False
+        return True
+
+    def payload_digests(self) -> list[tuple[str, str]]:
+        # (value, digest) pairs for big values in the prompt, so that cache keys use the digest instead of the value
+        return []
+
 
 class CustomLLMQuery(LLMQuery):
 
@@ -49,4 +57,8 @@ class CustomLLMQuery(LLMQuery):
         pass
 
     def expects_json(self) -> bool:
-        return self._expects_json
\ No newline at end of file
+        return self._expects_json
+
+    def cacheable(self) -> bool:
+        # Sampled responses are expected to vary
+        return self._temperature == 0
\ No newline at end of file
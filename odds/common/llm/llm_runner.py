@@ -1,3 +1,7 @@
+import asyncio
+import json
+from typing import Any
+
 from .llm_query import LLMQuery
 from .llm_cache import LLMCache
 from ..cost_collector import CostCollector
@@ -7,6 +11,59 @@ class LLMRunner:
     def __init__(self, name, costs) -> None:
         self.cache = LLMCache(name)
         self.cost_collector = CostCollector(name, costs)
+        self.in_flight: dict[str, asyncio.Task] = dict()
+
+    async def fetch_data(self, request: dict, query: LLMQuery) -> Any:
+        # Concurrent identical requests share a single call (and a single cost charge) -
+        # the first one makes it and the rest wait for its response
+        key = self.cache.cache_key(request, query.payload_digests())
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self.cached_fetch_data(request, query, key))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        # One caller being cancelled doesn't cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def cached_fetch_data(self, request: dict, query: LLMQuery, key: str) -> Any:
+        cacheable = query.cacheable()
+        if cacheable:
+            cached = await self.cache.get_cache(key)
+            # Unparseable responses are fetched again (and replaced), as they may have been cached before they were checked
+            if cached is not None and self.parse_content(query, cached) is not None:
+                return cached
+        content = await self.internal_fetch_data(request, query)
+        # Responses which can't be parsed aren't cached, so that the request is retried next time
+        if content is not None and cacheable and self.parse_content(query, content) is not None:
+            await self.cache.set_cache(key, content)
+        return content
+
+    async def internal_fetch_data(self, request: dict, query: LLMQuery) -> Any:
+        pass
+
+    def parse_content(self, query: LLMQuery, content: str) -> Any:
+        # Returns None if a JSON response can't be parsed
+        if not query.expects_json():
+            return content
+        parsed = None
+        try:
+            parsed = json.loads(content)
+        except:
+            pass
+        try:
+            selected_brackets_p = None
+            selected_brackets = None
+            for brackets in ['[]', '{}']:
+                if brackets[0] in content and brackets[1] in content and (selected_brackets_p is None or content.index(brackets[0]) < selected_brackets_p):
+                    selected_brackets_p = content.index(brackets[0])
+                    selected_brackets = brackets
+
+            if selected_brackets is not None:
+                content = content[content.index(selected_brackets[0]):content.rindex(selected_brackets[1])+1]
+                parsed = json.loads(content)
+        except:
+            pass
+        return parsed
 
     async def run(self, query: LLMQuery, conversation=[]) -> None:
         pass
@@ -1,11 +1,10 @@
 from typing import Any
-import httpx
-import json
 
 from ..llm_runner import LLMRunner
 from ..llm_query import LLMQuery
 from ...config import config
 from ...retry import Retry
+from ...http_client import http_clients
 
 class OpenAILLMRunner(LLMRunner):
 
@@ -28,15 +27,12 @@ class OpenAILLMRunner(LLMRunner):
         super().__init__('openai', self.COSTS)
 
     async def internal_fetch_data(self, request: dict, query: LLMQuery) -> Any:
-        cached = self.cache.get_cache(request)
-        if cached is not None:
-            return cached
         headers = {
             'Authorization': f'Bearer {config.credentials.openai.key}',
             'OpenAI-Organization': config.credentials.openai.org,
             'Content-Type': 'application/json'
         }
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client('api') as client:
             response = await Retry(timeout=30)(client, 'post',
                 'https://api.openai.com/v1/chat/completions',
                 json=request,
@@ -52,7 +48,6 @@ class OpenAILLMRunner(LLMRunner):
                     self.cost_collector.end_transaction()
                 if result.get('choices') and result['choices'][0].get('message') and result['choices'][0]['message'].get('content'):
                     content: str = result['choices'][0]['message']['content']
-                    self.cache.set_cache(request, content)
                     return content
 
     async def run(self, query: LLMQuery, conversation=[]) -> Any:
@@ -71,30 +66,10 @@ class OpenAILLMRunner(LLMRunner):
             ],
             temperature=temperature
         )
-        content = await self.internal_fetch_data(request, query)
+        content = await self.fetch_data(request, query)
         if content is not None:
             self.cache.store_log(conversation, [('assistant', content)])
-            if query.expects_json():
-                parsed = None
-                try:
-                    parsed = json.loads(content)
-                except:
-                    pass
-                try:
-                    selected_brackets_p = None
-                    selected_brackets = None
-                    for brackets in ['[]', '{}']:
-                        if brackets[0] in content and brackets[1] in content and (selected_brackets_p is None or content.index(brackets[0]) < selected_brackets_p):
-                            selected_brackets_p = content.index(brackets[0])
-                            selected_brackets = brackets
-
-                    if selected_brackets is not None:
-                        content = content[content.index(selected_brackets[0]):content.rindex(selected_brackets[1])+1]
-                        parsed = json.loads(content)
-                except:
-                    pass
-            else:
-                parsed = content
+            parsed = self.parse_content(query, content)
             if parsed is None:
                 print('ERROR PARSING RESULT', query.dataset, content)
             else:
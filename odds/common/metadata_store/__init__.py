@@ -1,4 +1,4 @@
-from .metadata_store import MetadataStore
+from .metadata_store import MetadataStore, Projection
 from ..select import select
 from .fs.fs_metadata_store import FSMetadataStore
 from .s3.s3_metadata_store import S3MetadataStore
@@ -7,11 +7,13 @@ from ...common.datatypes_website import WebsiteResource
 from ...common.datatypes import Dataset, Resource, Field
 
 
-def dataset_factory(data: dict) -> Dataset:
+def dataset_factory(data: dict, partial=False) -> Dataset:
     resources = data.pop('resources', [])
     for resource in resources:
+        # Chunk vectors used to be nested in the dataset, they're now in a separate index
+        resource.pop('chunks', None)
         fields = []
-        for f in resource['fields']:
+        for f in resource.get('fields') or []:
             f.update(json.loads(f.pop('props', None) or '{}'))
             f = dict(
                 (k, v) for k, v in f.items() if k in Field.__dataclass_fields__
@@ -26,13 +28,17 @@ def dataset_factory(data: dict) -> Dataset:
     catalogId = data.pop('catalogId')
     title= data.pop('title')
     dataset = Dataset(catalogId, id, title, **data)
-    dataset.status_embedding = bool(embedding)
+    if not partial:
+        dataset.status_embedding = bool(embedding)
     if embedding:
         dataset.embedding = np.array(embedding, dtype=np.float32)
     return dataset
 
 
 def resource_factory(**data):
+    # Partial documents (see Projection) might not have all required fields
+    data.setdefault('url', None)
+    data.setdefault('file_format', None)
     if data.get('kind') == 'socrata':
         return SocrataResource(**data)
     elif data.get('kind') == 'website':
@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+from elasticsearch import AsyncElasticsearch
+
+from ...config import config
+from .es_client import ESClient
+
+
+class ESBulkWriter:
+
+    # Buffers document writes and sends them together through the _bulk API.
+    # A batch is sent when it reaches MAX_ACTIONS or MAX_BYTES, or FLUSH_INTERVAL seconds after its first write.
+    # Only the items which failed with a transient error are retried.
+    # Configurable in odds.config.yaml:
+    # es_bulk:
+    #   max_actions: 500
+    #   max_bytes_mb: 10
+    #   flush_interval: 5
+    MAX_ACTIONS = 500
+    MAX_BYTES_MB = 10
+    FLUSH_INTERVAL = 5
+    RETRIES = 3
+    RETRY_DELAY = 2
+    RETRY_STATUSES = (429, 502, 503, 504)
+
+    def __init__(self, on_error=None) -> None:
+        bulk_config = config.es_bulk
+        self.max_actions = (bulk_config and bulk_config.max_actions) or self.MAX_ACTIONS
+        self.max_bytes = ((bulk_config and bulk_config.max_bytes_mb) or self.MAX_BYTES_MB) * 1024 * 1024
+        self.flush_interval = (bulk_config and bulk_config.flush_interval) or self.FLUSH_INTERVAL
+        self.on_error = on_error
+        self.pending: list[tuple[dict, dict]] = []
+        self.pending_bytes = 0
+        self.pending_ids: dict[tuple[str, str], int] = dict()
+        self.timer: asyncio.Task = None
+        self.lock: asyncio.Lock = None
+
+    def has_pending(self, index: str, id: str) -> bool:
+        return (index, id) in self.pending_ids
+
+    async def update(self, index: str, id: str, doc: dict, upsert=True):
+        action = dict(update=dict(_index=index, _id=id))
+        await self.add(action, dict(doc=doc, doc_as_upsert=upsert))
+
+    async def add(self, action: dict, source: dict):
+        meta = next(iter(action.values()))
+        key = (meta['_index'], meta['_id'])
+        self.pending.append((action, source))
+        self.pending_ids[key] = self.pending_ids.get(key, 0) + 1
+        self.pending_bytes += len(json.dumps(source, ensure_ascii=False))
+        if len(self.pending) >= self.max_actions or self.pending_bytes >= self.max_bytes:
+            await self.flush()
+        elif self.timer is None or self.timer.done():
+            self.timer = asyncio.create_task(self.flush_later())
+
+    async def flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        # Writes are sent in the order they were made, so a later batch waits for the previous one
+        async with self.lock:
+            batch, self.pending, self.pending_bytes = self.pending, [], 0
+            if not batch:
+                return
+            try:
+                async with ESClient() as client:
+                    await self.send(client, batch)
+            finally:
+                for action, _ in batch:
+                    meta = next(iter(action.values()))
+                    key = (meta['_index'], meta['_id'])
+                    self.pending_ids[key] -= 1
+                    if not self.pending_ids[key]:
+                        del self.pending_ids[key]
+
+    async def send(self, client: AsyncElasticsearch, batch: list[tuple[dict, dict]]):
+        for attempt in range(self.RETRIES + 1):
+            operations = []
+            for action, source in batch:
+                operations.extend([action, source])
+            try:
+                result = await client.bulk(operations=operations)
+            except Exception as e:
+                if attempt == self.RETRIES:
+                    for action, source in batch:
+                        self.failed(action, source, repr(e))
+                    return
+                print('RETRYING BULK', len(batch), repr(e)[:300])
+                await asyncio.sleep(self.RETRY_DELAY * (2 ** attempt))
+                continue
+            if not result.get('errors'):
+                return
+            retry = []
+            for (action, source), item in zip(batch, result['items']):
+                item = next(iter(item.values()))
+                if not item.get('error'):
+                    continue
+                if item.get('status') in self.RETRY_STATUSES and attempt < self.RETRIES:
+                    retry.append((action, source))
+                else:
+                    self.failed(action, source, item['error'])
+            if not retry:
+                return
+            batch = retry
+            await asyncio.sleep(self.RETRY_DELAY * (2 ** attempt))
+
+    def failed(self, action: dict, source: dict, error):
+        if self.on_error:
+            self.on_error(action, source, error)
+        else:
+            print('BULK WRITE FAILED', action, repr(error)[:300])
@@ -1,3 +1,5 @@
+import asyncio
+import weakref
 
 from elasticsearch import AsyncElasticsearch
 
@@ -6,26 +8,46 @@ from ...config import config
 
 class ESClient:
 
+    # A process-wide pooled client (one per event loop), shared by all ES based stores.
+    # `async with ESClient() as client:` borrows it and doesn't close it, ESClient.close() does on shutdown.
+    # The pool size can be set in odds.config.yaml:
+    # es_client:
+    #   connections_per_node: 32
+    CONNECTIONS_PER_NODE = 32
+
+    clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncElasticsearch] = weakref.WeakKeyDictionary()
+
     def __init__(self):
         self.es = None
 
     def get_es_client(self) -> AsyncElasticsearch:
+        es_config = config.es_client
         es = AsyncElasticsearch(
             f'https://{config.credentials.es.host}:{config.credentials.es.port}/',
             basic_auth=(config.credentials.es.username, config.credentials.es.password),
-            ca_certs=config.credentials.es.ca_cert_path, request_timeout=300, retry_on_timeout=True, max_retries=60
+            ca_certs=config.credentials.es.ca_cert_path, request_timeout=300, retry_on_timeout=True, max_retries=60,
+            connections_per_node=(es_config and es_config.connections_per_node) or self.CONNECTIONS_PER_NODE,
         )
         return es
 
+    def get(self) -> AsyncElasticsearch:
+        loop = asyncio.get_running_loop()
+        es = self.clients.get(loop)
+        if es is None:
+            es = self.clients[loop] = self.get_es_client()
+        return es
+
     # async context manager:
     async def __aenter__(self):
-        self.es = self.get_es_client()
+        self.es = self.get()
         return self.es
-    
+
     async def __aexit__(self, exc_type, exc, tb):
-        await self.es.close()
         self.es = None
         return False
 
-
-
+    @classmethod
+    async def close(cls):
+        es = cls.clients.pop(asyncio.get_running_loop(), None)
+        if es is not None:
+            await es.close()
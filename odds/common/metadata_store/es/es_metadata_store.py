@@ -9,12 +9,14 @@ from ....common.retry import BaseRetry
 from ....common.datatypes import Embedding
 from ..dataset_factory import dataset_factory
 
-from ..metadata_store import DatasetResult, MetadataStore
+from ..metadata_store import DatasetResult, MetadataStore, Projection
 from ...datatypes import Dataset
 from ...realtime_status import realtime_status as rts
 from ...embedder import embedder
 
 from .es_client import ESClient
+from .es_bulk_writer import ESBulkWriter
+from .es_vectors import vector_mapping, source_mapping, f16_mapping, fit_vector, compact_source, encode_vectors, decode_vectors
 
 ES_INDEX = 'datasets'
 MAPPING = {
@@ -62,6 +64,11 @@ MAPPING = {
                 'loading_error': {'type': 'text'},
                 'kind': {'type': 'keyword'},
                 'content': {'type': 'text'},
+                'etag': {'type': 'keyword', 'index': False},
+                'last_modified': {'type': 'keyword', 'index': False},
+                'content_size': {'type': 'long', 'index': False},
+                'content_hash': {'type': 'keyword', 'index': False},
+                'content_key': {'type': 'keyword', 'index': False},
                 'quality_issues': {
                     'type': 'nested',
                     'properties': {
@@ -70,17 +77,7 @@ MAPPING = {
                         'description': {'type': 'text'}
                     }
                 },
-                'chunks': {
-                    'type': 'nested', 
-                    'properties': {
-                        'embeddings': {
-                            'type': 'dense_vector',
-                            'dims': embedder.vector_size(),
-                            'index': True,
-                            'similarity': 'cosine'
-                        }
-                    }
-                }
+                'chunk_ids': {'type': 'keyword', 'index': False},
             }
         },
         'better_title': {'type': 'text'},
@@ -99,14 +96,14 @@ MAPPING = {
             }
         },
         'versions': {'type': 'object', 'enabled': False},
-        'embeddings': {
-            'type': 'dense_vector',
-            'dims': embedder.vector_size(),
-            'index': True,
-            'similarity': 'cosine'
-        }
+        'fingerprint': {'type': 'keyword', 'index': False},
+        'embeddings': vector_mapping(embedder.vector_size()),
+        'embeddings_f16': f16_mapping(),
     }
 }
+VECTOR_FIELDS = ['embeddings']
+SOURCE = source_mapping(VECTOR_FIELDS)
+INDEX_MAPPINGS = dict(MAPPING, _source=SOURCE) if SOURCE else MAPPING
 
 class ESMetadataStore(MetadataStore):
 
@@ -114,6 +111,7 @@ class ESMetadataStore(MetadataStore):
 
     def __init__(self):
         self.initialized = False
+        self.writer = ESBulkWriter(on_error=self.write_failed)
 
     async def single_time_init(self, client: Elasticsearch):
         if self.initialized:
@@ -123,13 +121,14 @@ class ESMetadataStore(MetadataStore):
             assert await client.ping()
             if not await client.indices.exists(index=ES_INDEX):
                 await client.indices.create(index=ES_INDEX, body={
-                    'mappings': MAPPING
+                    'mappings': INDEX_MAPPINGS
                 })
             else:
                 # Update mapping
                 await client.indices.put_mapping(index=ES_INDEX, **MAPPING)
         except Exception as e:
             print('ESMetadataStore initialization error:', e)
+            print('If the vector settings (embeddings in odds.config.yaml) were changed, run utils/migrate_es_indices.py')
             sys.exit(1)
 
     async def storeDataset(self, dataset: Dataset, ctx: str) -> None:
@@ -146,34 +145,69 @@ class ESMetadataStore(MetadataStore):
                         if k not in ['name', 'data_type']:
                             props[k] = field.pop(k)
                     field['props'] = json.dumps(props, ensure_ascii=False)
-            try:
-                ret = await BaseRetry(timeout=30)(client, 'update', index='datasets', id=id, doc=body, doc_as_upsert=True)
-            except Exception as e:
-                rts.set(ctx, f'ERROR STORING DATASET {dataset.title} -> {id}: {e!r}', 'error')
-                json.dump(body, open(f'/srv/.caches/error_{id}.json', 'w'))
+            embedding = getattr(dataset, 'embedding', None)
+            if compact_source() and embedding is not None:
+                # Vectors aren't in _source, so a partial update would drop the ones that aren't resent
+                body['embeddings'] = fit_vector(embedding, embedder.vector_size()).tolist()
+            encode_vectors(body, VECTOR_FIELDS)
+        await self.writer.update(ES_INDEX, id, body)
+
+    def write_failed(self, action: dict, source: dict, error):
+        id = action['update']['_id']
+        print(f'ERROR STORING DATASET {id}: {error!r}')
+        json.dump(source.get('doc'), open(f'/srv/.caches/error_{id}.json', 'w'))
+
+    async def flush(self) -> None:
+        await self.writer.flush()
         
-    async def getDataset(self, datasetId: str) -> Dataset:
+    async def getDataset(self, datasetId: str, projection: Projection = Projection.FULL) -> Dataset:
         async with ESClient() as client:
             await self.single_time_init(client)
+            if self.writer.has_pending(ES_INDEX, datasetId):
+                await self.writer.flush()
 
-            exists = await BaseRetry(timeout=30)(client, 'exists', index=ES_INDEX, id=datasetId)
-            if exists:
-                data = await BaseRetry()(client, 'get', index=ES_INDEX, id=datasetId)
-                data = data.get('_source')
-                if not data:
-                    return None
+            # A missing dataset is a 404 response and not an error, so this is a single round trip
+            data = await BaseRetry(timeout=30)(client.options(ignore_status=404), 'get', index=ES_INDEX, id=datasetId, **projection.es_params())
+            if not data or not data.get('found'):
+                return None
+            data = data.get('_source')
+            if not data:
+                return None
+            data = dict(data)
+            decode_vectors(data, VECTOR_FIELDS)
+            try:
+                return dataset_factory(data, partial=projection != Projection.FULL)
+            except Exception as e:
+                print('ERROR PARSING DATASET', datasetId, e)
+                return None
+    
+    async def getDatasetsByIds(self, datasetIds: list[str], projection: Projection = Projection.FULL) -> dict[str, Dataset]:
+        if not datasetIds:
+            return dict()
+        async with ESClient() as client:
+            await self.single_time_init(client)
+            if any(self.writer.has_pending(ES_INDEX, datasetId) for datasetId in datasetIds):
+                await self.writer.flush()
+            ret = await BaseRetry(timeout=30)(client, 'mget', index=ES_INDEX, ids=datasetIds, **projection.es_params())
+            datasets = dict()
+            for doc in (ret or {}).get('docs', []):
+                data = doc.get('_source')
+                if not doc.get('found') or not data:
+                    continue
                 data = dict(data)
+                decode_vectors(data, VECTOR_FIELDS)
                 try:
-                    return dataset_factory(data)
+                    datasets[doc['_id']] = dataset_factory(data, partial=projection != Projection.FULL)
                 except Exception as e:
-                    print('ERROR PARSING DATASET', datasetId, e)
-                    return None
-            return None
-    
+                    print('ERROR PARSING DATASET', doc['_id'], e)
+            return datasets
+
     async def hasDataset(self, datasetId: str) -> bool:
         async with ESClient() as client:
             await self.single_time_init(client)
             print('FETCHING DATASET', datasetId)
+            if self.writer.has_pending(ES_INDEX, datasetId):
+                return True
             return await BaseRetry()(client, 'exists', index=ES_INDEX, id=datasetId)
 
     # async def findDatasets(self, embedding: Embedding) -> list[Dataset]:
@@ -184,19 +218,15 @@ class ESMetadataStore(MetadataStore):
             return
         async with ESClient() as client:
             await self.single_time_init(client)
-            doc = dict(embeddings=embedding.tolist())
-            ret = await BaseRetry()(client, 'update',
-                index=ES_INDEX,
-                id=dataset.storeId(),
-                doc=doc,
-                doc_as_upsert=True
-            )
-            dataset.embedding = embedding
+            doc = dict(embeddings=fit_vector(embedding, embedder.vector_size()).tolist())
+            encode_vectors(doc, VECTOR_FIELDS)
+        await self.writer.update(ES_INDEX, dataset.storeId(), doc)
+        dataset.embedding = embedding
 
     async def getEmbedding(self, dataset: Dataset) -> Embedding:
         return await super().getEmbedding(dataset)
 
-    async def getDatasets(self, catalogId: str, page=1, sort=None, query=None, filters=None) -> DatasetResult:
+    async def getDatasets(self, catalogId: str, page=1, sort=None, query=None, filters=None, projection: Projection = Projection.FULL) -> DatasetResult:
         async with ESClient() as client:
             await self.single_time_init(client)
             body = {
@@ -230,14 +260,15 @@ class ESMetadataStore(MetadataStore):
             if filters:
                 for k, v in filters.items():
                     body['query']['bool']['must'].append({'match': {k: v}})
-            ret = await BaseRetry(timeout=30)(client, 'search', index=ES_INDEX, body=body)
+            ret = await BaseRetry(timeout=30)(client, 'search', index=ES_INDEX, body=body, **projection.es_params())
             total = ret['hits']['total']['value']
             datasets = []
             for hit in ret['hits']['hits']:
                 data = hit['_source']
                 data = dict(data)
+                decode_vectors(data, VECTOR_FIELDS)
                 try:
-                    datasets.append(dataset_factory(data))
+                    datasets.append(dataset_factory(data, partial=projection != Projection.FULL))
                 except Exception as e:
                     print('ERROR PARSING DATASET', e)
                     continue
@@ -0,0 +1,68 @@
+import time
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_scan, async_bulk
+
+from .es_vectors import fit_vector, encode_vectors, decode_vectors, _containers
+
+
+# Migrating an index copies all its documents into a new versioned index (<alias>_v<timestamp>) created with
+# the current mapping, converting the stored vectors on the way (shortened and renormalized to the configured
+# dimensions, compact copies added or removed), and then atomically points the alias at the new index.
+# Writers should be stopped while migrating, as changes made during the copy would be lost.
+# Previous versioned indices are kept and can be deleted once the new one is verified.
+
+BULK_SIZE = 200
+
+
+def transform_vectors(doc: dict, vector_fields: list[str], dims: int) -> dict:
+    decode_vectors(doc, vector_fields)
+    for field in vector_fields:
+        for container, key in _containers(doc, field.split('.')):
+            if container.get(key) is not None:
+                container[key] = fit_vector(container[key], dims).tolist()
+    encode_vectors(doc, vector_fields)
+    return doc
+
+
+async def migrate_index(client: AsyncElasticsearch, alias: str, mappings: dict, vector_fields: list[str], dims: int, transform=None):
+    sources = []
+    if await client.indices.exists_alias(name=alias):
+        sources = list((await client.indices.get_alias(name=alias)).keys())
+    elif await client.indices.exists(index=alias):
+        sources = [alias]
+    source_mappings = await client.indices.get_mapping(index=sources) if sources else {}
+    for source in sources:
+        source_source = source_mappings[source]['mappings'].get('_source') or {}
+        if source_source.get('excludes') and not any(source_mappings[source]['mappings']['properties'].get(field.split('.')[0] + '_f16') for field in vector_fields):
+            raise ValueError(f'{source} excludes vectors from _source without compact copies, they cannot be migrated')
+
+    index = f'{alias}_v{int(time.time())}'
+    print(f'MIGRATING {alias} ({", ".join(sources) or "new"}) -> {index}')
+    await client.indices.create(index=index, mappings=mappings)
+
+    if sources:
+        async def actions():
+            async for hit in async_scan(client, index=','.join(sources), query={'query': {'match_all': {}}}, size=BULK_SIZE):
+                yield dict(
+                    _index=index,
+                    _id=hit['_id'],
+                    _source=transform_vectors(transform(hit['_source']) if transform else hit['_source'], vector_fields, dims)
+                )
+        copied, errors = await async_bulk(client, actions(), chunk_size=BULK_SIZE, raise_on_error=False)
+        if errors:
+            await client.indices.delete(index=index)
+            raise ValueError(f'Failed to copy {len(errors)} documents into {index}, first error: {errors[0]}')
+        await client.indices.refresh(index=index)
+        print(f'COPIED {copied} documents')
+
+    actions = [dict(add=dict(index=index, alias=alias))]
+    for source in sources:
+        if source == alias:
+            # A concrete index with the alias' name has to go so that the alias can take its place
+            actions.append(dict(remove_index=dict(index=source)))
+        else:
+            actions.append(dict(remove=dict(index=source, alias=alias)))
+    await client.indices.update_aliases(actions=actions)
+    print(f'{alias} -> {index}')
+
@@ -0,0 +1,93 @@
+import base64
+
+import numpy as np
+
+from ...config import config
+
+
+# Vector storage options, configurable in odds.config.yaml:
+# embeddings:
+#   dimensions: 512               # requested output dimensions from the embedding model
+#   index_options:                # dense_vector index options, e.g. int8_hnsw / int4_hnsw / bbq_hnsw
+#     type: int8_hnsw
+#   source_encoding: float16      # keep vectors out of _source, with a compact base64 float16 copy instead
+# Changing any of these for an existing index requires running utils/migrate_es_indices.py
+
+F16_SUFFIX = '_f16'
+
+
+def compact_source() -> bool:
+    return (config.embeddings and config.embeddings.source_encoding) == 'float16'
+
+
+def vector_mapping(dims: int) -> dict:
+    mapping = {
+        'type': 'dense_vector',
+        'dims': dims,
+        'index': True,
+        'similarity': 'cosine'
+    }
+    index_options = config.embeddings and config.embeddings.index_options
+    if index_options:
+        mapping['index_options'] = dict(index_options.data)
+    return mapping
+
+
+def source_mapping(vector_fields: list[str]) -> dict:
+    # The vectors themselves are then only kept in the (quantized) HNSW index
+    if compact_source():
+        return {'excludes': vector_fields}
+    return None
+
+
+def f16_mapping() -> dict:
+    return {'type': 'binary'}
+
+
+def fit_vector(vector, dims: int) -> np.ndarray:
+    # text-embedding-3 vectors can be shortened by truncating and renormalizing them
+    vector = np.asarray(vector, dtype=np.float32)
+    if dims and len(vector) > dims:
+        vector = vector[:dims]
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+    return vector
+
+
+def encode_f16(vector) -> str:
+    return base64.b64encode(np.asarray(vector, dtype=np.float16).tobytes()).decode('ascii')
+
+
+def decode_f16(encoded: str) -> list[float]:
+    return np.frombuffer(base64.b64decode(encoded), dtype=np.float16).astype(np.float32).tolist()
+
+
+def encode_vectors(doc: dict, fields: list[str]):
+    # Adds a compact copy of each vector field in the document (fields are dotted paths, lists are traversed)
+    if not compact_source():
+        return
+    for field in fields:
+        for container, key in _containers(doc, field.split('.')):
+            if container.get(key) is not None:
+                container[key + F16_SUFFIX] = encode_f16(container[key])
+
+
+def decode_vectors(doc: dict, fields: list[str]):
+    # Restores vector fields which were excluded from _source from their compact copies
+    for field in fields:
+        for container, key in _containers(doc, field.split('.')):
+            encoded = container.pop(key + F16_SUFFIX, None)
+            if encoded is not None and container.get(key) is None:
+                container[key] = decode_f16(encoded)
+
+
+def _containers(doc, path: list[str]):
+    if isinstance(doc, list):
+        for item in doc:
+            yield from _containers(item, path)
+    elif isinstance(doc, dict):
+        if len(path) == 1:
+            yield doc, path[0]
+        elif doc.get(path[0]) is not None:
+            yield from _containers(doc[path[0]], path[1:])
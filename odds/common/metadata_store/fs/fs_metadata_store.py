@@ -2,7 +2,7 @@ import hashlib
 import json
 import dataclasses
 
-from ..metadata_store import MetadataStore
+from ..metadata_store import MetadataStore, Projection
 from ...config import CACHE_DIR
 from ...datatypes import Dataset, Resource, Field
 from ...datatypes_socrata import SocrataResource
@@ -19,7 +19,7 @@ class FSMetadataStore(MetadataStore):
         with open(filename, 'w') as file:
             json.dump(dataclasses.asdict(dataset), file, indent=2, ensure_ascii=False)
         
-    async def getDataset(self, datasetId: str) -> Dataset:
+    async def getDataset(self, datasetId: str, projection: Projection = Projection.FULL) -> Dataset:
         filename = self.get_filename('dataset', datasetId, 'json')
         if filename.exists():
             with open(filename) as file:
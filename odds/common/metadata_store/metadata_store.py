@@ -1,3 +1,4 @@
+import asyncio
 import dataclasses
 from typing import List
 from ..datatypes import Dataset, Embedding
@@ -11,14 +12,64 @@ class DatasetResult:
     page: int
 
 
+@dataclasses.dataclass(frozen=True)
+class Projection:
+    # Which parts of a stored dataset to read (dotted paths, e.g. 'resources.content').
+    # Stores which can't read partial documents return the whole dataset.
+    includes: tuple[str, ...] = None
+    excludes: tuple[str, ...] = None
+
+    def es_params(self) -> dict:
+        params = dict()
+        if self.includes:
+            params['source_includes'] = list(self.includes)
+        if self.excludes:
+            params['source_excludes'] = list(self.excludes)
+        return params
+
+
+VECTORS = ('embeddings', 'embeddings_f16')
+# Everything, for datasets which are going to be stored again
+Projection.FULL = Projection()
+# Everything except for the vectors
+Projection.NO_VECTORS = Projection(excludes=VECTORS)
+# Dataset level metadata and the list of resources without their content and fields
+Projection.LIST = Projection(excludes=VECTORS + ('resources.content', 'resources.fields', 'resources.chunk_ids'))
+# Resources with their fields and schema, for working with a resource's data
+Projection.RESOURCES = Projection(excludes=VECTORS + ('resources.content', 'resources.chunk_ids'))
+# Dataset level metadata with the resources' content, without their fields
+Projection.FETCH = Projection(excludes=VECTORS + ('resources.fields', 'resources.chunk_ids', 'resources.db_schema'))
+# Just the dataset's identity
+Projection.IDS = Projection(includes=('catalogId', 'id', 'title'))
+# Processing status, for deciding whether a dataset needs to be processed again
+Projection.STATUS = Projection(includes=(
+    'catalogId', 'id', 'title', 'summary', 'better_title', 'better_description',
+    'status_embedding', 'status_indexing', 'quality_score', 'versions',
+    'resources.url', 'resources.status', 'resources.status_selected', 'resources.status_loaded', 'resources.chunk_ids',
+))
+# Just enough to show a dataset in search results
+Projection.SUMMARY = Projection(includes=(
+    'catalogId', 'id', 'title', 'better_title', 'description', 'better_description', 'summary', 'publisher', 'link',
+))
+
+
 class MetadataStore:
 
     async def storeDataset(self, dataset: Dataset, ctx: str) -> None:
         print('STORING DATASET', dataset.catalogId, dataset.id, dataset.title)
 
-    async def getDataset(self, datasetId: str) -> Dataset:
+    async def flush(self) -> None:
+        # Stores which buffer their writes send them here
+        pass
+
+    async def getDataset(self, datasetId: str, projection: Projection = Projection.FULL) -> Dataset:
         return None
         
+    async def getDatasetsByIds(self, datasetIds: list[str], projection: Projection = Projection.FULL) -> dict[str, Dataset]:
+        # Existing datasets by their id, missing ones are left out
+        datasets = await asyncio.gather(*[self.getDataset(datasetId, projection) for datasetId in datasetIds])
+        return dict((datasetId, dataset) for datasetId, dataset in zip(datasetIds, datasets) if dataset)
+
     async def hasDataset(self, datasetId: str) -> bool:
         return False
     
@@ -30,7 +81,7 @@ class MetadataStore:
             return dataset.embedding
         return None
     
-    async def getDatasets(self, catalogId: str, page=1, sort=None, query=None, filters=None) -> DatasetResult:
+    async def getDatasets(self, catalogId: str, page=1, sort=None, query=None, filters=None, projection: Projection = Projection.FULL) -> DatasetResult:
         return DatasetResult([], 0, 0, page)
         
     # async def findDatasets(self, embedding: Embedding) -> list[Dataset]:
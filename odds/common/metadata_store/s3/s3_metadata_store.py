@@ -6,7 +6,7 @@ import dataclasses
 import aioboto3
 
 from ...config import config, CACHE_DIR
-from ..metadata_store import MetadataStore
+from ..metadata_store import MetadataStore, Projection
 from ...datatypes import Dataset, Resource, Field
 from ...realtime_status import realtime_status as rts
 
@@ -37,7 +37,7 @@ class S3MetadataStore(MetadataStore):
             obj = await bucket.Object(key)
             await obj.put(Body=json.dumps(dataclasses.asdict(dataset), indent=2, ensure_ascii=False).encode('utf-8'))
         
-    async def getDataset(self, datasetId: str) -> Dataset:
+    async def getDataset(self, datasetId: str, projection: Projection = Projection.FULL) -> Dataset:
         async with self.bucket() as bucket:
             key = self.get_key('dataset', datasetId, 'json')
             try:
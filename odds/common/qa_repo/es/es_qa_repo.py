@@ -13,6 +13,7 @@ from ...realtime_status import realtime_status as rts
 from ...embedder import embedder
 
 from ...metadata_store.es.es_client import ESClient
+from ...metadata_store.es.es_vectors import vector_mapping, source_mapping, f16_mapping, encode_vectors
 
 ES_INDEX = 'qna'
 MAPPING = {
@@ -24,14 +25,13 @@ MAPPING = {
         'score': {'type': 'integer'},
         'deployment_id': {'type': 'keyword'},
         'last_updated': {'type': 'date'},
-        'embeddings': {
-            'type': 'dense_vector',
-            'dims': embedder.vector_size(),
-            'index': True,
-            'similarity': 'cosine'
-        }
+        'embeddings': vector_mapping(embedder.vector_size()),
+        'embeddings_f16': f16_mapping(),
     }
 }
+VECTOR_FIELDS = ['embeddings']
+SOURCE = source_mapping(VECTOR_FIELDS)
+INDEX_MAPPINGS = dict(MAPPING, _source=SOURCE) if SOURCE else MAPPING
 class ESQARepo(QARepo):
 
     PAGE_SIZE = 20
@@ -46,7 +46,7 @@ class ESQARepo(QARepo):
         assert await client.ping()
         if not await client.indices.exists(index=ES_INDEX):
             await client.indices.create(index=ES_INDEX, body={
-                'mappings': MAPPING
+                'mappings': INDEX_MAPPINGS
             })
         else:
             # Update mapping
@@ -77,6 +77,7 @@ class ESQARepo(QARepo):
                 embeddings=(await embedder.embed(question)).tolist(),
                 last_updated=datetime.datetime.now(datetime.timezone.utc).isoformat()
             )
+            encode_vectors(body, VECTOR_FIELDS)
             try:
                 await client.create(index=ES_INDEX, id=id, body=body)
             except elasticsearch.ConflictError:
@@ -0,0 +1,117 @@
+import asyncio
+import datetime
+import email.utils
+import time
+
+import httpx
+
+from .config import config
+
+
+class HostBucket:
+
+    # A token bucket (implemented as GCRA - each request reserves the next free slot),
+    # with additive increase of the rate on success and multiplicative decrease on throttling
+
+    def __init__(self, host: str, rate: float, burst: int, min_rate: float) -> None:
+        self.host = host
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.tat = 0
+        self.blocked_until = 0
+        self.throttles = 0
+
+    async def acquire(self):
+        now = time.monotonic()
+        interval = 1 / self.rate
+        tat = max(self.tat, now)
+        allow_at = max(tat - (self.burst - 1) * interval, self.blocked_until)
+        self.tat = max(tat, allow_at) + interval
+        delay = allow_at - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def success(self):
+        self.throttles = 0
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def throttled(self, retry_after: float = None):
+        self.throttles += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        if retry_after is None:
+            retry_after = 2 ** min(self.throttles, 6)
+        retry_after = min(retry_after, RateLimiter.MAX_BLOCK)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+        print(f'RATE LIMITED BY {self.host}, BLOCKED FOR {retry_after}s, RATE NOW {self.rate:.2f}/s')
+
+
+class RateLimiter:
+
+    # Per-host limits for all outbound fetching, configurable in odds.config.yaml:
+    # rate_limits:
+    #   default:
+    #     rate: 4
+    #     burst: 8
+    #   hosts:
+    #     data.example.gov:
+    #       rate: 1
+    DEFAULTS = dict(rate=4, burst=8, min_rate=0.1)
+    THROTTLE_STATUSES = (429, 503)
+    MAX_BLOCK = 300
+
+    def __init__(self) -> None:
+        self.buckets: dict[str, HostBucket] = {}
+
+    def bucket(self, host: str) -> HostBucket:
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            options = dict(self.DEFAULTS)
+            rate_limits = config.rate_limits
+            if rate_limits:
+                options.update(rate_limits.get('default') or {})
+                options.update((rate_limits.get('hosts') or {}).get(host) or {})
+            bucket = self.buckets[host] = HostBucket(host, **options)
+        return bucket
+
+    @staticmethod
+    def host(request: httpx.Request) -> str:
+        # Requests through the fetcher proxy are limited by the host they're actually fetching
+        target = request.url.params.get('url')
+        if target and request.url.path.startswith('/fetch'):
+            try:
+                return httpx.URL(target).host or request.url.host
+            except Exception:
+                pass
+        return request.url.host
+
+    @staticmethod
+    def retry_after(response: httpx.Response) -> float:
+        value = response.headers.get('retry-after')
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+            return max(0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+        except Exception:
+            return None
+
+    async def on_request(self, request: httpx.Request):
+        await self.bucket(self.host(request)).acquire()
+
+    async def on_response(self, response: httpx.Response):
+        bucket = self.bucket(self.host(response.request))
+        if response.status_code in self.THROTTLE_STATUSES:
+            bucket.throttled(self.retry_after(response))
+        else:
+            bucket.success()
+
+    def event_hooks(self) -> dict:
+        return dict(request=[self.on_request], response=[self.on_response])
+
+
+rate_limiter = RateLimiter()
@@ -1,5 +1,7 @@
 from .realtime_status import RealtimeStatus
 from ..select import select
 from .peewee.peewee_rts import PeeweeRealtimeStatus
+from .redis.redis_rts import RedisRealtimeStatus
+from .memory.memory_rts import MemoryRealtimeStatus
 
 realtime_status: RealtimeStatus = select('RealtimeStatus', locals())()
\ No newline at end of file
@@ -0,0 +1,52 @@
+import datetime
+import threading
+
+from ..realtime_status import RealtimeStatus, Status
+
+
+class MemoryRealtimeStatus(RealtimeStatus):
+
+    # In-process statuses, expiring TTL seconds after their last update (errors after ERROR_TTL)
+    TTL = 3600
+    ERROR_TTL = 7 * 86400
+
+    def __init__(self, ttl=None, error_ttl=None) -> None:
+        self.ttl = datetime.timedelta(seconds=ttl or self.TTL)
+        self.error_ttl = datetime.timedelta(seconds=error_ttl or self.ERROR_TTL)
+        self.statuses: dict[str, Status] = dict()
+        self.lock = threading.Lock()
+
+    def set(self, ctx: str, message: str, kind='info') -> None:
+        now = datetime.datetime.now()
+        with self.lock:
+            current = self.statuses.get(ctx)
+            created = current.created if current else now
+            self.statuses[ctx] = Status(ctx=ctx, msg=message, kind=kind, created=created, updated=now)
+
+    def clear(self, ctx: str) -> None:
+        with self.lock:
+            current = self.statuses.get(ctx)
+            if current and current.kind != 'error':
+                del self.statuses[ctx]
+
+    def clearAll(self) -> None:
+        with self.lock:
+            self.statuses = dict()
+
+    def current(self) -> list[Status]:
+        now = datetime.datetime.now()
+        with self.lock:
+            for ctx, status in list(self.statuses.items()):
+                ttl = self.error_ttl if status.kind == 'error' else self.ttl
+                if status.updated + ttl < now:
+                    del self.statuses[ctx]
+            return list(self.statuses.values())
+
+    def get(self) -> list[Status]:
+        statuses = [s for s in self.current() if s.kind != 'error']
+        statuses.sort(key=lambda s: s.ctx)
+        statuses.sort(key=lambda s: (s.updated, s.kind), reverse=True)
+        return statuses
+
+    def errors(self) -> list[Status]:
+        return sorted((s for s in self.current() if s.kind == 'error'), key=lambda s: s.created)
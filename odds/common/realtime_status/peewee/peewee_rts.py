@@ -1,32 +1,97 @@
+import atexit
 import datetime
+import threading
+import time
+
+from peewee import EXCLUDED
 
 from ..realtime_status import RealtimeStatus, Status
+from ...config import config
 
 from .models import Status as StatusModel
 from .base_model import db
 
 class PeeweeRealtimeStatus(RealtimeStatus):
 
+    # Updates are kept in memory, coalesced by ctx, and written to the DB by a background thread
+    # every FLUSH_INTERVAL seconds, so that callers never wait for the database.
+    # Configurable in odds.config.yaml:
+    # realtime_status:
+    #   flush_interval: 1
+    FLUSH_INTERVAL = 1.0
+
     def __init__(self) -> None:
         db.create_tables([StatusModel])
+        rts_config = config.realtime_status
+        self.flush_interval = (rts_config and rts_config.flush_interval) or self.FLUSH_INTERVAL
+        # ctx -> the latest update: a (message, kind, updated) tuple, or None to clear it
+        self.pending: dict[str, tuple | None] = dict()
+        self.pending_lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.flusher: threading.Thread = None
+        atexit.register(self.flush)
+
+    def ensure_flusher(self):
+        if self.flusher is None or not self.flusher.is_alive():
+            self.flusher = threading.Thread(target=self.run_flusher, name='realtime-status-flusher', daemon=True)
+            self.flusher.start()
+
+    def run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print('FAILED TO FLUSH REALTIME STATUS', repr(e))
+
+    def flush(self) -> None:
+        with self.write_lock:
+            with self.pending_lock:
+                pending, self.pending = self.pending, dict()
+            if not pending:
+                return
+            cleared = [ctx for ctx, update in pending.items() if update is None]
+            rows = [
+                dict(ctx=ctx, message=update[0], kind=update[1], updated=update[2])
+                for ctx, update in pending.items() if update is not None
+            ]
+            with db.atomic():
+                if cleared:
+                    StatusModel.delete().where(StatusModel.ctx.in_(cleared), StatusModel.kind!='error').execute()
+                for i in range(0, len(rows), 500):
+                    StatusModel.insert_many(rows[i:i + 500])\
+                        .on_conflict(
+                            conflict_target=(StatusModel.ctx,),
+                            update={
+                                StatusModel.message: EXCLUDED.message,
+                                StatusModel.kind: EXCLUDED.kind,
+                                StatusModel.updated: EXCLUDED.updated,
+                            }
+                        )\
+                        .execute()
 
     def set(self, ctx: str, message: str, kind='info') -> None:
-        params = dict(
-            message=message,
-            kind=kind,
-            updated=datetime.datetime.now()
-        )
         ctx = ctx[:254]
-        StatusModel.insert(ctx=ctx, **params)\
-            .on_conflict('update', update=params, conflict_target=(StatusModel.ctx,))\
-            .execute()
-        print(f'{ctx}:{message}')
+        with self.pending_lock:
+            self.pending[ctx] = (message, kind, datetime.datetime.now())
+        self.ensure_flusher()
+        if config.debug or kind == 'error':
+            print(f'{ctx}:{message}')
 
     def clear(self, ctx: str) -> None:
-        StatusModel.delete().where(StatusModel.ctx == ctx, StatusModel.kind!='error').execute()
+        ctx = ctx[:254]
+        with self.pending_lock:
+            update = self.pending.get(ctx)
+            # Errors are never cleared
+            if update is None or update[1] != 'error':
+                self.pending[ctx] = None
+        self.ensure_flusher()
 
     def clearAll(self) -> None:
-        StatusModel.delete().execute()
+        with self.write_lock:
+            with self.pending_lock:
+                self.pending = dict()
+            StatusModel.delete().execute()
 
     def get(self) -> list[Status]:
         return [
@@ -0,0 +1,221 @@
+import atexit
+import datetime
+import os
+import socket
+import threading
+import time
+
+import redis
+
+from ..realtime_status import RealtimeStatus, Status
+from ..memory.memory_rts import MemoryRealtimeStatus
+from ...config import config
+
+
+class RedisRealtimeStatus(RealtimeStatus):
+
+    # Each status is a hash which expires TTL seconds after its last update (ERROR_TTL for errors),
+    # indexed in sorted sets shared by all workers - by update time for statuses and by creation time for errors.
+    # Statuses are namespaced per worker process, so clearAll() only clears the caller's own ones.
+    # As in PeeweeRealtimeStatus, updates are kept in memory, coalesced by ctx, and written in a single pipeline
+    # by a background thread every FLUSH_INTERVAL seconds, so that callers never wait for Redis.
+    # The connection is made on first use; statuses are kept in-process while Redis isn't available,
+    # and the connection is retried every RECONNECT_INTERVAL seconds (moving these statuses to Redis once it's back).
+    # Configurable in odds.config.yaml:
+    # realtime_status:
+    #   redis_url: redis://redis:6379/0
+    #   namespace: worker-1
+    #   ttl: 3600
+    #   error_ttl: 604800
+    #   flush_interval: 1
+    REDIS_URL = 'redis://redis:6379/0'
+    PREFIX = 'odds:rts'
+    TTL = 3600
+    ERROR_TTL = 7 * 86400
+    FLUSH_INTERVAL = 1.0
+    RECONNECT_INTERVAL = 30
+    MAX_ITEMS = 1000
+
+    def __init__(self) -> None:
+        rts_config = config.realtime_status
+        self.ttl = (rts_config and rts_config.ttl) or self.TTL
+        self.error_ttl = (rts_config and rts_config.error_ttl) or self.ERROR_TTL
+        self.flush_interval = (rts_config and rts_config.flush_interval) or self.FLUSH_INTERVAL
+        self.redis_url = (rts_config and rts_config.redis_url) or self.REDIS_URL
+        self.namespace = (rts_config and rts_config.namespace) or f'{socket.gethostname()}-{os.getpid()}'
+        self.active_key = f'{self.PREFIX}:active'
+        self.errors_key = f'{self.PREFIX}:errors'
+        self.redis: redis.Redis = None
+        self.fallback: MemoryRealtimeStatus = None
+        self.failed_at: float = None
+        # ctx -> the latest update: a (message, kind, updated) tuple, or None to clear it
+        self.pending: dict[str, tuple | None] = dict()
+        self.pending_clear_all = False
+        self.pending_lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.connect_lock = threading.Lock()
+        self.flusher: threading.Thread = None
+        atexit.register(self.flush)
+
+    def connection(self) -> redis.Redis:
+        # Returns None when falling back to in-process statuses
+        with self.connect_lock:
+            if self.redis is None and (self.failed_at is None or time.time() - self.failed_at > self.RECONNECT_INTERVAL):
+                client = redis.Redis.from_url(self.redis_url, decode_responses=True, socket_timeout=5)
+                try:
+                    client.ping()
+                except redis.RedisError as e:
+                    if self.failed_at is None:
+                        print('REDIS NOT AVAILABLE FOR REALTIME STATUS, USING IN-PROCESS STATUS', repr(e))
+                    self.failed_at = time.time()
+                    if self.fallback is None:
+                        self.fallback = MemoryRealtimeStatus(self.ttl, self.error_ttl)
+                    return None
+                self.redis = client
+                if self.fallback is not None:
+                    print('REDIS AVAILABLE FOR REALTIME STATUS')
+                    # The in-process statuses are written with the next flush, unless they were updated since
+                    with self.pending_lock:
+                        for status in self.fallback.current():
+                            self.pending.setdefault(status.ctx, (status.msg, status.kind, status.updated.timestamp()))
+                    self.fallback.clearAll()
+            return self.redis
+
+    def status_key(self, ctx: str) -> str:
+        return f'{self.PREFIX}:{self.namespace}:status:{ctx}'
+
+    def namespace_key(self) -> str:
+        return f'{self.PREFIX}:{self.namespace}:keys'
+
+    def ensure_flusher(self):
+        if self.flusher is None or not self.flusher.is_alive():
+            self.flusher = threading.Thread(target=self.run_flusher, name='realtime-status-flusher', daemon=True)
+            self.flusher.start()
+
+    def run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print('FAILED TO FLUSH REALTIME STATUS', repr(e))
+
+    def flush(self) -> None:
+        with self.write_lock:
+            with self.pending_lock:
+                pending, self.pending = self.pending, dict()
+                clear_all, self.pending_clear_all = self.pending_clear_all, False
+            if not pending and not clear_all:
+                return
+            client = self.connection()
+            if client is None:
+                if clear_all:
+                    self.fallback.clearAll()
+                for ctx, update in pending.items():
+                    if update is None:
+                        self.fallback.clear(ctx)
+                    else:
+                        self.fallback.set(ctx, update[0], update[1])
+                return
+            try:
+                if clear_all:
+                    self.delete_non_errors(client, list(client.smembers(self.namespace_key())))
+                self.delete_non_errors(client, [self.status_key(ctx) for ctx, update in pending.items() if update is None])
+                updates = [(ctx, update) for ctx, update in pending.items() if update is not None]
+                if not updates:
+                    return
+                pipe = client.pipeline(transaction=False)
+                for ctx, (message, kind, now) in updates:
+                    key = self.status_key(ctx)
+                    is_error = kind == 'error'
+                    pipe.hset(key, mapping=dict(ctx=ctx, msg=message, kind=kind, updated=now))
+                    pipe.hsetnx(key, 'created', now)
+                    pipe.expire(key, self.error_ttl if is_error else self.ttl)
+                    if is_error:
+                        pipe.zadd(self.errors_key, {key: now}, nx=True)
+                        pipe.zrem(self.active_key, key)
+                    else:
+                        pipe.zadd(self.active_key, {key: now})
+                        pipe.zrem(self.errors_key, key)
+                    pipe.sadd(self.namespace_key(), key)
+                pipe.expire(self.namespace_key(), self.error_ttl)
+                pipe.execute()
+            except redis.RedisError as e:
+                print('FAILED TO WRITE REALTIME STATUS', repr(e))
+
+    def set(self, ctx: str, message: str, kind='info') -> None:
+        with self.pending_lock:
+            self.pending[ctx] = (message, kind, time.time())
+        self.ensure_flusher()
+        if config.debug or kind == 'error':
+            print(f'{ctx}:{message}')
+
+    def clear(self, ctx: str) -> None:
+        with self.pending_lock:
+            update = self.pending.get(ctx)
+            # Errors are never cleared
+            if update is None or update[1] != 'error':
+                self.pending[ctx] = None
+        self.ensure_flusher()
+
+    def clearAll(self) -> None:
+        # Only this worker's statuses, errors are kept until they expire
+        with self.pending_lock:
+            self.pending = dict()
+            self.pending_clear_all = True
+        self.ensure_flusher()
+
+    def delete_non_errors(self, client: redis.Redis, keys: list[str]):
+        if not keys:
+            return
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hget(key, 'kind')
+        kinds = pipe.execute()
+        keys = [key for key, kind in zip(keys, kinds) if kind != 'error']
+        for i in range(0, len(keys), 500):
+            pipe = client.pipeline(transaction=False)
+            pipe.delete(*keys[i:i + 500])
+            pipe.zrem(self.active_key, *keys[i:i + 500])
+            pipe.srem(self.namespace_key(), *keys[i:i + 500])
+            pipe.execute()
+
+    def load(self, index_key: str, reverse: bool) -> list[Status]:
+        # The newest MAX_ITEMS entries, in either order.
+        # Index entries of expired statuses are removed on the way
+        if reverse:
+            keys = self.redis.zrevrange(index_key, 0, self.MAX_ITEMS - 1)
+        else:
+            keys = self.redis.zrange(index_key, -self.MAX_ITEMS, -1)
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+        statuses = []
+        expired = []
+        for key, data in zip(keys, pipe.execute()):
+            if not data:
+                expired.append(key)
+                continue
+            if (data['kind'] == 'error') != (index_key == self.errors_key):
+                continue
+            statuses.append(Status(
+                ctx=data['ctx'], msg=data['msg'], kind=data['kind'],
+                created=datetime.datetime.fromtimestamp(float(data.get('created') or data['updated'])),
+                updated=datetime.datetime.fromtimestamp(float(data['updated'])),
+            ))
+        if expired:
+            self.redis.zrem(index_key, *expired)
+        return statuses
+
+    def get(self) -> list[Status]:
+        if self.connection() is None:
+            return self.fallback.get()
+        # Entries older than the TTL have certainly expired
+        self.redis.zremrangebyscore(self.active_key, '-inf', time.time() - self.ttl)
+        return self.load(self.active_key, reverse=True)
+
+    def errors(self) -> list[Status]:
+        if self.connection() is None:
+            return self.fallback.errors()
+        # Errors are indexed by their creation time
+        return self.load(self.errors_key, reverse=False)
@@ -9,7 +9,7 @@ CONFIG = {
     'Embedder': 'OpenAIEmbedder',
     'Indexer': 'ESIndexer',
     'DBStorage': 'PeeweeDBStorage',
-    'RealtimeStatus': 'PeeweeRealtimeStatus',
+    'RealtimeStatus': 'RedisRealtimeStatus',
     'QARepo': 'ESQARepo',
 }
 
@@ -1,3 +1,4 @@
+import json
 import os
 import hashlib
 import numpy as np
@@ -25,6 +26,13 @@ class FSStore(Store):
         np.save(filename, embedding)
         
     async def getDB(self, resource: Resource, dataset: Dataset) -> str:
+        # Resources loaded before content keys were versioned only have their content hash
+        content_key = resource.content_key or resource.content_hash
+        if content_key:
+            filename = await self.getContentDB(content_key)
+            if filename:
+                print('GETTING CONTENT DB', dataset.catalogId, dataset.id, resource.title, filename)
+                return filename
         id = '{}/{}'.format(dataset.storeId(), resource.url)
         filename = self.get_filename('db', id, 'sqlite')
         print('GETTING DB', dataset.catalogId, dataset.id, resource.title, filename)
@@ -37,6 +45,32 @@ class FSStore(Store):
             return np.load(filename)
         return None
     
+    async def storeContentDB(self, content_hash: str, dbFile, ctx: str) -> bool:
+        filename = self.get_filename('content-db', content_hash, 'sqlite')
+        rts.set(ctx, f'STORING CONTENT-DB {content_hash} -> {filename}')
+        os.replace(dbFile, filename)
+        return True
+
+    async def storeContentMeta(self, content_hash: str, meta: dict, ctx: str) -> None:
+        filename = self.get_filename('content-meta', content_hash, 'json')
+        tmp_filename = filename.with_suffix('.tmp')
+        with open(tmp_filename, 'w') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_filename, filename)
+
+    async def getContentDB(self, content_hash: str) -> str:
+        filename = self.get_filename('content-db', content_hash, 'sqlite')
+        if filename.exists():
+            return filename
+        return None
+
+    async def getContentMeta(self, content_hash: str) -> dict:
+        filename = self.get_filename('content-meta', content_hash, 'json')
+        if filename.exists():
+            with open(filename) as f:
+                return json.load(f)
+        return None
+
     def get_filename(self, kind, id, suffix):
         hash = hashlib.md5(id.encode()).hexdigest()[:16]
         dir = DIR / kind / hash[:2] / hash[2:4]
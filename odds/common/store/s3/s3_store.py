@@ -1,5 +1,6 @@
 from contextlib import asynccontextmanager
 import hashlib
+import json
 import numpy as np
 from io import BytesIO
 
@@ -50,22 +51,67 @@ class S3Store(Store):
             await obj.upload_fileobj(filename)
 
     async def getDB(self, resource: Resource, dataset: Dataset) -> str:
+        # Resources loaded before content keys were versioned only have their content hash
+        content_key = resource.content_key or resource.content_hash
+        if content_key:
+            filename = await self.getContentDB(content_key)
+            if filename:
+                print('GETTING CONTENT DB', dataset.catalogId, dataset.id, resource.title, filename)
+                return filename
         async with self.bucket() as bucket:
             id = '{}/{}'.format(dataset.storeId(), resource.url)
             key = self.get_key('db', id, 'sqlite')
             print('GETTING DB', dataset.catalogId, dataset.id, resource.title, key)
+            return await self.download_db(bucket, key)
+
+    async def download_db(self, bucket, key) -> str:
+        try:
+            obj = await bucket.Object(key)
+            await obj.load()
+            # download the file into a temporary file:
+            key = key.replace('/', '_')
+            outfile = self.cachedir / f'{key}.sqlite'
+            if not outfile.exists():
+                await obj.download_file(str(outfile))
+            return str(outfile)
+        except Exception as e:
+            pass
+        return None
+
+    async def storeContentDB(self, content_hash: str, dbFile, ctx: str) -> bool:
+        async with self.bucket() as bucket:
+            key = self.get_content_key('content-db', content_hash, 'sqlite')
+            rts.set(ctx, f'STORING CONTENT-DB {content_hash} -> {key}')
+            obj = await bucket.Object(key)
+            await obj.upload_file(dbFile)
+            return False
+
+    async def storeContentMeta(self, content_hash: str, meta: dict, ctx: str) -> None:
+        async with self.bucket() as bucket:
+            key = self.get_content_key('content-meta', content_hash, 'json')
+            obj = await bucket.Object(key)
+            await obj.put(Body=json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    async def getContentDB(self, content_hash: str) -> str:
+        # Content DBs never change, so a locally cached copy is always valid
+        key = self.get_content_key('content-db', content_hash, 'sqlite')
+        outfile = self.cachedir / '{}.sqlite'.format(key.replace('/', '_'))
+        if outfile.exists():
+            return str(outfile)
+        async with self.bucket() as bucket:
+            return await self.download_db(bucket, key)
+
+    async def getContentMeta(self, content_hash: str) -> dict:
+        async with self.bucket() as bucket:
+            key = self.get_content_key('content-meta', content_hash, 'json')
             try:
                 obj = await bucket.Object(key)
-                await obj.load()
-                # download the file into a temporary file:
-                key = key.replace('/', '_')
-                outfile = self.cachedir / f'{key}.sqlite'
-                if not outfile.exists():
-                    await obj.download_file(str(outfile))
-                return str(outfile)
-            except Exception as e:
+                content = await obj.get()
+                content = await content['Body'].read()
+                return json.loads(content)
+            except:
                 pass
-        return None
+            return None
     
     async def getEmbedding(self, dataset: Dataset) -> Embedding:
         async with self.bucket() as bucket:
@@ -85,3 +131,6 @@ class S3Store(Store):
     def get_key(self, kind, id, suffix):
         hash = hashlib.md5(id.encode()).hexdigest()[:16]
         return f'{kind}/{hash[:2]}/{hash[2:4]}/{hash}.{suffix}'
+
+    def get_content_key(self, kind, content_hash, suffix):
+        return f'{kind}/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.{suffix}'
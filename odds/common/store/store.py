@@ -14,3 +14,19 @@ class Store:
 
     async def getEmbedding(self, dataset: Dataset) -> Embedding:
         return None
+
+    # Content-addressed storage, keyed by the SHA-256 of the downloaded file:
+    # identical files behind different URLs / datasets are processed and stored once
+
+    async def storeContentDB(self, content_hash: str, dbFile, ctx: str) -> bool:
+        print('STORING CONTENT DB', content_hash, dbFile)
+        return False
+
+    async def storeContentMeta(self, content_hash: str, meta: dict, ctx: str) -> None:
+        print('STORING CONTENT META', content_hash)
+
+    async def getContentDB(self, content_hash: str) -> str:
+        return None
+
+    async def getContentMeta(self, content_hash: str) -> dict:
+        return None
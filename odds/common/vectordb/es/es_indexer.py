@@ -1,21 +1,122 @@
+import sys
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_bulk, async_scan
+
 from ...metadata_store.dataset_factory import dataset_factory
+from ...metadata_store.metadata_store import Projection
 from ...datatypes import Embedding, Dataset
 from ...metadata_store.es.es_client import ESClient
-from ...metadata_store.es.es_metadata_store import ES_INDEX
+from ...metadata_store.es.es_metadata_store import ES_INDEX, VECTOR_FIELDS
+from ...metadata_store.es.es_vectors import vector_mapping, source_mapping, f16_mapping, fit_vector, encode_vectors, decode_vectors
+from ...embedder import embedder
+from ...retry import BaseRetry
 from ..indexer import Indexer
 
 import json
 
+# Resource chunks are kept in their own flat index, one document per chunk,
+# so that updating a dataset doesn't rewrite all of its chunk vectors
+CHUNKS_INDEX = 'chunks'
+CHUNKS_MAPPING = {
+    'properties': {
+        'dataset_id': {'type': 'keyword'},
+        'catalogId': {'type': 'keyword'},
+        'resource_url': {'type': 'keyword', 'index': False},
+        'chunk_hash': {'type': 'keyword'},
+        'embeddings': vector_mapping(embedder.vector_size()),
+        'embeddings_f16': f16_mapping(),
+    }
+}
+CHUNKS_VECTOR_FIELDS = ['embeddings']
+CHUNKS_SOURCE = source_mapping(CHUNKS_VECTOR_FIELDS)
+CHUNKS_INDEX_MAPPINGS = dict(CHUNKS_MAPPING, _source=CHUNKS_SOURCE) if CHUNKS_SOURCE else CHUNKS_MAPPING
+BULK_SIZE = 500
+
+
 class ESIndexer(Indexer):
 
     def __init__(self, vector_size) -> None:
-        pass
+        self.vector_size = vector_size
+        self.initialized = False
+
+    async def single_time_init(self, client: AsyncElasticsearch):
+        if self.initialized:
+            return
+        self.initialized = True
+        try:
+            if not await client.indices.exists(index=CHUNKS_INDEX):
+                await client.indices.create(index=CHUNKS_INDEX, body={
+                    'mappings': CHUNKS_INDEX_MAPPINGS
+                })
+            else:
+                await client.indices.put_mapping(index=CHUNKS_INDEX, **CHUNKS_MAPPING)
+        except Exception as e:
+            print('ESIndexer initialization error:', e)
+            print('If the vector settings (embeddings in odds.config.yaml) were changed, run utils/migrate_es_indices.py')
+            sys.exit(1)
 
     async def index(self, dataset: Dataset, embedding: Embedding) -> None:
         # update the embedding field in the document in the ES index:
         pass
+
+    async def getChunkIds(self, dataset: Dataset) -> set[str]:
+        async with ESClient() as es:
+            await self.single_time_init(es)
+            chunk_ids = set()
+            async for hit in async_scan(es, index=CHUNKS_INDEX, query=dict(query=dict(term=dict(dataset_id=dataset.storeId())), _source=False), size=BULK_SIZE):
+                chunk_ids.add(hit['_id'])
+            return chunk_ids
+
+    async def indexChunks(self, dataset: Dataset, chunk_ids: list[str], new_chunks: list[dict]) -> None:
+        dataset_id = dataset.storeId()
+        async with ESClient() as es:
+            await self.single_time_init(es)
+            if new_chunks:
+                def actions():
+                    for chunk in new_chunks:
+                        doc = dict(
+                            dataset_id=dataset_id,
+                            catalogId=dataset.catalogId,
+                            resource_url=chunk['resource_url'],
+                            chunk_hash=chunk['chunk_hash'],
+                            embeddings=fit_vector(chunk['embeddings'], self.vector_size).tolist(),
+                        )
+                        encode_vectors(doc, CHUNKS_VECTOR_FIELDS)
+                        yield dict(_op_type='create', _index=CHUNKS_INDEX, _id=chunk['id'], _source=doc)
+                _, errors = await async_bulk(es, actions(), chunk_size=BULK_SIZE, raise_on_error=False)
+                # Chunks which were already indexed (by a concurrent run) are fine
+                errors = [error for error in errors if error.get('create', {}).get('status') != 409]
+                if errors:
+                    print('ERROR INDEXING CHUNKS', dataset_id, len(errors), errors[0])
+            # Remove the dataset's chunks which are no longer part of it
+            await BaseRetry(timeout=30)(es, 'delete_by_query',
+                index=CHUNKS_INDEX,
+                query=dict(bool=dict(
+                    filter=[dict(term=dict(dataset_id=dataset_id))],
+                    must_not=[dict(ids=dict(values=chunk_ids))],
+                )),
+                conflicts='proceed',
+            )
+
+    async def findChunkScores(self, es: AsyncElasticsearch, embedding: Embedding, num: int, catalog_ids: list[str] | None) -> dict[str, float]:
+        # Best matching chunk score per dataset
+        await self.single_time_init(es)
+        knn = dict(
+            field='embeddings',
+            query_vector=fit_vector(embedding, self.vector_size).tolist(),
+            k=num,
+            num_candidates=max(50, num * 5),
+        )
+        if catalog_ids is not None:
+            knn['filter'] = dict(terms=dict(catalogId=catalog_ids))
+        results = await es.search(index=CHUNKS_INDEX, knn=knn, collapse=dict(field='dataset_id'), size=num, source=False, fields=['dataset_id'])
+        return {
+            hit['fields']['dataset_id'][0]: hit['_score']
+            for hit in results['hits']['hits']
+        }
     
-    async def findDatasets(self, embedding: Embedding, query, num=10, catalog_ids: list[str] | None=None) -> list[str]:
+    async def findDatasets(self, embedding: Embedding, query, num=10, catalog_ids: list[str] | None=None, projection: Projection = Projection.FULL) -> list[Dataset]:
         async with ESClient() as es:
             # search for the nearest neighbors of the given embedding in the ES
             # index and return the ids of the datasets:
@@ -37,24 +138,21 @@ class ESIndexer(Indexer):
                     boost=0.8
                 )
             )
-            chunks=dict(
-                nested=dict(
-                    path="resources.chunks",
-                    query=dict(
-                        knn=dict(
-                            field="resources.chunks.embeddings",
-                            query_vector=embedding.tolist(),
-                            k=10,
-                            num_candidates=50,
-                            boost=0.5
-                        )
+            # Datasets with matching chunks are boosted by their best chunk's score
+            chunk_scores = await self.findChunkScores(es, embedding, 10, catalog_ids)
+            chunks=[
+                dict(
+                    constant_score=dict(
+                        filter=dict(ids=dict(values=[dataset_id])),
+                        boost=0.5 * score
                     )
                 )
-            )
+                for dataset_id, score in chunk_scores.items()
+            ]
 
             query=dict(
                 bool=dict(
-                    should=[text_match, knn, chunks],
+                    should=[text_match, knn, *chunks],
                     minimum_should_match=1,
                 )
             )
@@ -64,6 +162,9 @@ class ESIndexer(Indexer):
                     dict(terms=dict(catalogId=catalog_ids))
                 ]
 
-            results = await es.search(index=ES_INDEX, query=query, size=num)
+            results = await es.search(index=ES_INDEX, query=query, size=num, **projection.es_params())
             datasets = [hit['_source'] for hit in results['hits']['hits']]
-            return [dataset_factory(dataset) for dataset in datasets]
+            for dataset in datasets:
+                decode_vectors(dataset, VECTOR_FIELDS)
+            return [dataset_factory(dataset, partial=projection != Projection.FULL) for dataset in datasets]
+
@@ -1,10 +1,18 @@
 from ..datatypes import Embedding, Dataset
+from ..metadata_store.metadata_store import Projection
 
 
 class Indexer:
 
     async def index(self, dataset: Dataset, embedding: Embedding) -> None:
         pass
+
+    async def getChunkIds(self, dataset: Dataset) -> set[str]:
+        return set()
+
+    async def indexChunks(self, dataset: Dataset, chunk_ids: list[str], new_chunks: list[dict]) -> None:
+        # chunk_ids are all of the dataset's current chunks, new_chunks are the ones not yet indexed (with their embeddings)
+        pass
     
-    async def findDatasets(self, embedding: Embedding, query, num=10, catalog_ids: list[str] | None = None) -> list[Dataset]:
+    async def findDatasets(self, embedding: Embedding, query, num=10, catalog_ids: list[str] | None = None, projection: Projection = Projection.FULL) -> list[Dataset]:
         return []
\ No newline at end of file
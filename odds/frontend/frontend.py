@@ -36,7 +36,7 @@ class ODDSFrontend:
     async def fetch_data(self, datapoint: str, conversation: list[str]=[]) -> str:
         conversation = conversation + [datapoint] # [slugify(datapoint, separator='_')[:64]]
         possible_dataset_names = await guess_dataset_names(datapoint, conversation=conversation)
-        embeddings = await asyncio.gather(*[embedder.embed(name) for name in possible_dataset_names])
+        embeddings = await embedder.embed_many(possible_dataset_names)
         dataset_ids = await asyncio.gather(*[indexer.findDatasets(embedding) for embedding in embeddings])
         # flatten dataset_ids:
         dataset_ids = [x for y in dataset_ids for x in y]
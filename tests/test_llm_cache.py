@@ -0,0 +1,35 @@
+import uuid
+
+from odds.backend.processor.resource_processor import ResourceProcessor
+from odds.common.datatypes import DataCatalog, Resource
+from odds.common.llm.llm_cache import LLMCache
+
+
+def document_cache_key(cache: LLMCache, catalog: DataCatalog, url: str, filename) -> str:
+    # The same steps as process_document and the LLM runners
+    content_hash, _ = ResourceProcessor.file_hash(filename)
+    resource = Resource(url=url, file_format='pdf', content_hash=content_hash)
+    query = ResourceProcessor.document_query('ctx', catalog, resource, str(filename))
+    request = dict(
+        model='model',
+        messages=[dict(role=role, content=content) for role, content in query.prompt()],
+        temperature=query.temperature(),
+    )
+    return cache.cache_key(request, query.payload_digests())
+
+
+def test_same_document_same_cache_key(tmp_path):
+    cache = LLMCache('test')
+    catalog = DataCatalog(id='catalog', kind='CKAN', url='https://example.com', title='Catalog')
+    data = b'%PDF-1.4\n' + bytes(range(256)) * 100
+    keys = []
+    # Two downloads of the same file (from different datasets) into random local file names
+    for url in ['https://example.com/a/report.pdf', 'https://example.com/b/report-copy.pdf']:
+        filename = tmp_path / f'{uuid.uuid4().hex}.pdf'
+        filename.write_bytes(data)
+        keys.append(document_cache_key(cache, catalog, url, filename))
+    assert keys[0] == keys[1]
+
+    other = tmp_path / f'{uuid.uuid4().hex}.pdf'
+    other.write_bytes(data + b'\n')
+    assert document_cache_key(cache, catalog, 'https://example.com/a/report.pdf', other) != keys[0]
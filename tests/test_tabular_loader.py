@@ -0,0 +1,42 @@
+import functools
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from odds.backend.tabular import tabular_loader
+
+
+MISSING_VALUES = ['None', 'NULL', 'N/A', 'NA', 'NAN', 'NaN', 'nan', '-']
+
+
+@pytest.fixture(scope='module')
+def executor():
+    # Same setup as ResourceProcessor.get_executor with `tabular_executor: process`
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        yield executor
+
+
+def run_load_tabular(executor, filename, sqlite_filename, deadline):
+    func = functools.partial(tabular_loader.load_tabular, deadline=deadline)
+    return executor.submit(func, str(filename), str(sqlite_filename), MISSING_VALUES, 100, 1000).result()
+
+
+def test_load_in_process(executor, tmp_path):
+    filename = tmp_path / 'data.csv'
+    filename.write_text('a,b\n1,x\n2,y\n')
+    loaded = run_load_tabular(executor, filename, tmp_path / 'data.sqlite', time.time() + 60)
+    assert loaded['row_count'] == 2
+
+
+def test_deadline_in_process(executor, tmp_path):
+    filename = tmp_path / 'data.csv'
+    filename.write_text('a,b\n1,x\n2,y\n')
+    with pytest.raises(TimeoutError, match='Deadline exceeded'):
+        run_load_tabular(executor, filename, tmp_path / 'data.sqlite', time.time() - 1)
+
+
+def test_load_failure_in_process(executor, tmp_path):
+    with pytest.raises(RuntimeError):
+        run_load_tabular(executor, tmp_path / 'missing.csv', tmp_path / 'data.sqlite', time.time() + 60)
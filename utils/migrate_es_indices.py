@@ -0,0 +1,27 @@
+import asyncio
+
+from odds.common.embedder import embedder
+from odds.common.metadata_store.es.es_client import ESClient
+from odds.common.metadata_store.es.es_migration import migrate_index
+from odds.common.metadata_store.es import es_metadata_store
+from odds.common.qa_repo.es import es_qa_repo
+from odds.common.vectordb.es import es_indexer
+
+# Rebuilds the ES indices with the current mappings (after changing the embeddings settings in odds.config.yaml)
+# Stop the workers and the API server before running this.
+
+def drop_nested_chunks(doc):
+    # Chunk vectors used to be nested in the dataset documents, they're re-created in the chunks index on the next embedding
+    for resource in doc.get('resources') or []:
+        resource.pop('chunks', None)
+    return doc
+
+async def main():
+    async with ESClient() as client:
+        await migrate_index(client, es_metadata_store.ES_INDEX, es_metadata_store.INDEX_MAPPINGS, es_metadata_store.VECTOR_FIELDS, embedder.vector_size(), transform=drop_nested_chunks)
+        await migrate_index(client, es_indexer.CHUNKS_INDEX, es_indexer.CHUNKS_INDEX_MAPPINGS, es_indexer.CHUNKS_VECTOR_FIELDS, embedder.vector_size())
+        await migrate_index(client, es_qa_repo.ES_INDEX, es_qa_repo.INDEX_MAPPINGS, es_qa_repo.VECTOR_FIELDS, embedder.vector_size())
+    await ESClient.close()
+
+if __name__ == '__main__':
+    asyncio.run(main())
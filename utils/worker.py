@@ -4,6 +4,9 @@ from arq.worker import create_pool
 
 from odds.backend import backend
 from odds.backend.processor import dataset_processor
+from odds.common.http_client import http_clients
+from odds.common.metadata_store import metadata_store
+from odds.common.metadata_store.es.es_client import ESClient
 import logging
 
 REDIS_SETTINGS = RedisSettings(host='redis')
@@ -24,6 +27,9 @@ async def startup(ctx):
 
 async def shutdown(ctx):
     await ctx['session'].aclose()
+    await metadata_store.flush()
+    await http_clients.aclose()
+    await ESClient.close()
     del ctx['backend']
 
 class WorkerSettings: